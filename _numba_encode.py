@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Эталонный Base64-кодировщик на Numba для проверки и как нижняя граница скорости.
+
+Не используется библиотекой: независимая реализация (12-битная таблица пар
+символов) для сверки результатов с ultrabase64 и stdlib. Требует numba и numpy.
+"""
+
+import numpy as np
+from numba import njit
+
+_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+
+# 4096 пар символов: 12 бит входа -> 2 символа Base64
+_PAIRS = np.array(
+    [[_ALPHABET[i >> 6], _ALPHABET[i & 63]] for i in range(4096)],
+    dtype=np.uint8,
+)
+
+
+@njit(cache=True)
+def _encode_numba(src, dst, pairs):
+    """Кодирует src в dst (dst длиной (len(src) + 2) // 3 * 4, с padding)."""
+    n = len(src)
+    main = n - n % 3
+    o = 0
+    for i in range(0, main, 3):
+        x = (np.uint32(src[i]) << 16) | (np.uint32(src[i + 1]) << 8) | np.uint32(src[i + 2])
+        hi = x >> 12
+        lo = x & 0xFFF
+        dst[o] = pairs[hi, 0]
+        dst[o + 1] = pairs[hi, 1]
+        dst[o + 2] = pairs[lo, 0]
+        dst[o + 3] = pairs[lo, 1]
+        o += 4
+
+    # Хвост из 1-2 байт с padding
+    rest = n - main
+    if rest:
+        x = np.uint32(src[main]) << 16
+        if rest == 2:
+            x |= np.uint32(src[main + 1]) << 8
+        dst[o] = pairs[x >> 12, 0]
+        dst[o + 1] = pairs[x >> 12, 1]
+        dst[o + 2] = pairs[x & 0xFFF, 0] if rest == 2 else 61  # '='
+        dst[o + 3] = 61
+
+
+def encode_numba(data):
+    """Кодирует bytes-like объект в Base64 (bytes), как base64.b64encode."""
+    src = np.frombuffer(data, dtype=np.uint8)
+    dst = np.empty((len(src) + 2) // 3 * 4, dtype=np.uint8)
+    _encode_numba(src, dst, _PAIRS)
+    return dst.tobytes()
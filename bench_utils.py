@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""Общие утилиты для бенчмарк-скриптов ultrabase64."""
+
+import gc
+import math
+import mmap
+import os
+import random
+import statistics
+import sys
+import timeit
+
+# Максимальный размер тестовых данных (совпадает с MAX_INPUT_SIZE библиотеки)
+MAX_DATA_SIZE = 100 * 1024 * 1024
+
+# Размер huge page (2 MB) и флаги mmap (в модуле mmap есть не везде)
+HUGE_PAGE_SIZE = 2 * 1024 * 1024
+_MAP_HUGETLB = getattr(mmap, "MAP_HUGETLB", 0x40000)
+_MAP_HUGE_2MB = 21 << 26  # log2(2 MB) << MAP_HUGE_SHIFT
+
+# Переиспользуемый буфер входных данных (создаётся лениво)
+_BUF = None
+
+
+def _alloc_linux_huge_pages(size):
+    """Выделяет анонимный mmap на 2 MB страницах.
+
+    Сначала явные hugetlbfs-страницы (нужен vm.nr_hugepages), затем обычное
+    отображение с подсказкой MADV_HUGEPAGE для transparent huge pages.
+    """
+    try:
+        return mmap.mmap(-1, size, flags=mmap.MAP_PRIVATE | _MAP_HUGETLB | _MAP_HUGE_2MB)
+    except OSError:
+        pass
+    buf = mmap.mmap(-1, size, flags=mmap.MAP_PRIVATE)
+    if hasattr(mmap, "MADV_HUGEPAGE"):
+        try:
+            buf.madvise(mmap.MADV_HUGEPAGE)
+        except OSError:
+            pass
+    return buf
+
+
+def _alloc_windows_large_pages(size):
+    """Выделяет буфер через VirtualAlloc(MEM_LARGE_PAGES) или возвращает None.
+
+    Large pages требуют включённой SeLockMemoryPrivilege ("Lock pages in
+    memory" в локальной политике безопасности); без неё вернётся None.
+    """
+    import ctypes
+    from ctypes import wintypes
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    advapi32 = ctypes.WinDLL("advapi32", use_last_error=True)
+
+    large_page = kernel32.GetLargePageMinimum()
+    if not large_page:
+        return None
+
+    class LUID(ctypes.Structure):
+        _fields_ = [("LowPart", wintypes.DWORD), ("HighPart", wintypes.LONG)]
+
+    class LUID_AND_ATTRIBUTES(ctypes.Structure):
+        _fields_ = [("Luid", LUID), ("Attributes", wintypes.DWORD)]
+
+    class TOKEN_PRIVILEGES(ctypes.Structure):
+        _fields_ = [("PrivilegeCount", wintypes.DWORD), ("Privileges", LUID_AND_ATTRIBUTES * 1)]
+
+    # 1. Включаем SeLockMemoryPrivilege в токене процесса
+    token = wintypes.HANDLE()
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    if not advapi32.OpenProcessToken(kernel32.GetCurrentProcess(), 0x0020 | 0x0008,  # ADJUST_PRIVILEGES | QUERY
+                                     ctypes.byref(token)):
+        return None
+    try:
+        privileges = TOKEN_PRIVILEGES(1)
+        if not advapi32.LookupPrivilegeValueW(None, "SeLockMemoryPrivilege",
+                                              ctypes.byref(privileges.Privileges[0].Luid)):
+            return None
+        privileges.Privileges[0].Attributes = 0x00000002  # SE_PRIVILEGE_ENABLED
+        ok = advapi32.AdjustTokenPrivileges(token, False, ctypes.byref(privileges), 0, None, None)
+        if not ok or ctypes.get_last_error() != 0:  # ERROR_NOT_ALL_ASSIGNED
+            return None
+    finally:
+        kernel32.CloseHandle(token)
+
+    # 2. Размер large-page выделения должен быть кратен GetLargePageMinimum()
+    rounded = (size + large_page - 1) // large_page * large_page
+    kernel32.VirtualAlloc.restype = ctypes.c_void_p
+    kernel32.VirtualAlloc.argtypes = [ctypes.c_void_p, ctypes.c_size_t, wintypes.DWORD, wintypes.DWORD]
+    ptr = kernel32.VirtualAlloc(None, rounded,
+                                0x00001000 | 0x00002000 | 0x20000000,  # COMMIT | RESERVE | LARGE_PAGES
+                                0x04)  # PAGE_READWRITE
+    if not ptr:
+        return None
+    # Буфер живёт до конца процесса, VirtualFree не нужен
+    return (ctypes.c_char * rounded).from_address(ptr)
+
+
+def _alloc_buffer(size):
+    """Выделяет буфер на huge pages, при неудаче - обычный bytearray."""
+    buf = None
+    try:
+        if sys.platform == "win32":
+            buf = _alloc_windows_large_pages(size)
+        elif sys.platform.startswith("linux"):
+            buf = _alloc_linux_huge_pages(size)
+    except (OSError, AttributeError, ValueError):
+        buf = None
+    if buf is None:
+        buf = bytearray(size)
+    return memoryview(buf).cast("B")[:size]
+
+
+def get_test_data(size_bytes):
+    """Возвращает детерминированные случайные данные заданного размера.
+
+    Буфер генерируется один раз и переиспользуется для всех точек замера,
+    вместо дорогого os.urandom() на каждом размере. Фиксированный seed
+    даёт одинаковые входные данные между запусками. Буфер размещается на
+    2 MB страницах (если ОС позволяет), чтобы промахи TLB на больших
+    размерах не искажали замеры кэшей.
+
+    Возвращает memoryview без копирования: кодировщики принимают любой
+    буфер, так что замеряются именно данные на huge pages.
+    """
+    global _BUF
+    if size_bytes > MAX_DATA_SIZE:
+        raise ValueError(f"Requested {size_bytes} bytes (max: {MAX_DATA_SIZE} bytes)")
+    if _BUF is None:
+        _BUF = _alloc_buffer(MAX_DATA_SIZE)
+        rng = random.Random(0)
+        for offset in range(0, MAX_DATA_SIZE, HUGE_PAGE_SIZE):
+            chunk = min(HUGE_PAGE_SIZE, MAX_DATA_SIZE - offset)
+            # getrandbits вместо randbytes: randbytes нет в Python 3.8
+            _BUF[offset:offset + chunk] = rng.getrandbits(8 * chunk).to_bytes(chunk, 'little')
+    return _BUF[:size_bytes]
+
+
+def pin_to_cpu(cpu):
+    """Привязывает процесс к ядру cpu. Ошибка только печатается."""
+    if sys.platform == "win32":
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        if not kernel32.SetProcessAffinityMask(kernel32.GetCurrentProcess(), 1 << cpu):
+            print(f"⚠️  Could not pin process to CPU {cpu}")
+    elif hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, {cpu})
+        except OSError as e:
+            print(f"⚠️  Could not pin process to CPU {cpu}: {e}")
+
+
+def pin_and_prioritize(cpu=None):
+    """Готовит процесс к замерам: привязка к ядру, приоритет, gc.freeze().
+
+    cpu - номер ядра для привязки процесса. Привязка наследуется всеми
+    потоками, поэтому для многопоточных реализаций (Rayon, Pipeline) её
+    нужно пропускать (cpu=None): иначе все рабочие потоки окажутся на одном
+    ядре. Ошибки (нет прав, неподдерживаемая платформа) не прерывают бенчмарк.
+    """
+    if cpu is not None:
+        pin_to_cpu(cpu)
+    if sys.platform == "win32":
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        if not kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), 0x00000080):  # HIGH_PRIORITY_CLASS
+            print("⚠️  Could not raise process priority")
+    else:
+        try:
+            os.nice(-10)
+        except OSError:
+            print("⚠️  Could not raise process priority (requires privileges)")
+
+    # Объекты, созданные при импорте, исключаются из последующих сборок GC
+    gc.freeze()
+
+
+def measure(func, *args, repeat=7):
+    """Замеряет время одного вызова func(*args) в наносекундах.
+
+    Размер серии подбирается timeit.Timer.autorange() (серия >= 0.2 с),
+    серия повторяется repeat раз. Возвращает время одного вызова для каждой
+    серии. timeit сам отключает GC на время замера.
+
+    Оператор-строка компилируется прямо в цикл timeit: в отличие от
+    lambda, на каждый вызов не создаётся лишний Python-кадр.
+    """
+    timer = timeit.Timer('f(*a)', globals={'f': func, 'a': args})
+    number, _ = timer.autorange()
+    return [total / number * 1e9 for total in timer.repeat(repeat=repeat, number=number)]
+
+
+def median_mad(samples):
+    """Возвращает медиану и MAD (median absolute deviation) выборки."""
+    median = statistics.median(samples)
+    return median, statistics.median(abs(x - median) for x in samples)
+
+
+def _betainc(a, b, x):
+    """Регуляризованная неполная бета-функция I_x(a, b) (цепная дробь, метод Лентца)."""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    # Цепная дробь быстро сходится только при x < (a + 1) / (a + b + 2)
+    if x > (a + 1.0) / (a + b + 2.0):
+        return 1.0 - _betainc(b, a, 1.0 - x)
+
+    tiny = 1e-300
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                     + a * math.log(x) + b * math.log1p(-x)) / a
+    c = 1.0
+    d = 1.0 - (a + b) * x / (a + 1.0)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    f = d
+    for m in range(1, 300):
+        # Чётный и нечётный шаги дроби
+        for num in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                    -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + num * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + num / c
+            c = c if abs(c) > tiny else tiny
+            f *= c * d
+        if abs(c * d - 1.0) < 1e-12:
+            break
+    return front * f
+
+
+def welch_ttest(a, b):
+    """Двусторонний t-тест Уэлча (дисперсии не предполагаются равными).
+
+    Возвращает (t, p). Использует scipy.stats.ttest_ind, если scipy
+    установлен, иначе считает t, степени свободы Уэлча-Саттертуэйта и p по
+    распределению Стьюдента сами.
+    """
+    try:
+        from scipy.stats import ttest_ind
+    except ImportError:
+        pass
+    else:
+        t, p = ttest_ind(a, b, equal_var=False)
+        return float(t), float(p)
+
+    va = statistics.variance(a) / len(a)
+    vb = statistics.variance(b) / len(b)
+    diff = statistics.mean(a) - statistics.mean(b)
+    if va + vb == 0.0:
+        return (0.0, 1.0) if diff == 0.0 else (math.copysign(math.inf, diff), 0.0)
+
+    t = diff / math.sqrt(va + vb)
+    df = (va + vb) ** 2 / (va ** 2 / (len(a) - 1) + vb ** 2 / (len(b) - 1))
+    return t, _betainc(df / 2.0, 0.5, df / (df + t * t))
+
+
+def cohens_d(a, b):
+    """Размер эффекта d Коэна: разность средних в единицах общего стандартного отклонения."""
+    na, nb = len(a), len(b)
+    pooled = math.sqrt(((na - 1) * statistics.variance(a) + (nb - 1) * statistics.variance(b))
+                       / (na + nb - 2))
+    diff = statistics.mean(a) - statistics.mean(b)
+    if pooled == 0.0:
+        return 0.0 if diff == 0.0 else math.copysign(math.inf, diff)
+    return diff / pooled
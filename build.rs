@@ -0,0 +1,7 @@
+// build.rs - cfg-флаги интерпретатора (Py_LIMITED_API, PyPy, GraalPy) для src/lib.rs
+fn main() {
+    println!("cargo:rustc-check-cfg=cfg(Py_LIMITED_API)");
+    println!("cargo:rustc-check-cfg=cfg(PyPy)");
+    println!("cargo:rustc-check-cfg=cfg(GraalPy)");
+    pyo3_build_config::use_pyo3_cfgs();
+}
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Границы кэшей: однопоточное кодирование с программным prefetch и без.
+
+Проверяет гипотезу "аппаратный prefetcher настолько эффективен, что обрыва
+на границе L3 не видно": если PREFETCHT0/PREFETCHNTA в цикле кодировщика
+ничего не дают, аппаратный prefetcher уже справляется.
+
+Размеры замеряются последовательно в одном процессе, привязанном к ядру.
+`--parallel` раздаёт размеры по процессам (по процессу на ядро, свои L1/L2):
+быстрее, но L3 и шина памяти общие, и точки около границы L3 шумнее.
+"""
+
+import multiprocessing
+import os
+import statistics
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import ultrabase64
+
+from bench_utils import (MAX_DATA_SIZE, cohens_d, get_test_data, measure, median_mad,
+                         pin_and_prioritize, pin_to_cpu, welch_ttest)
+
+# Дистанция prefetch в байтах (передаётся в кодировщик)
+PREFETCH_DISTANCE = 512
+
+# Границы зон по кэшам, определённым библиотекой (по умолчанию как у i7-7700:
+# L2 256 KB, L3 8 MB): зона 1 целиком в L2, зона 3 за L3
+_INFO = ultrabase64.get_info()
+L2_SIZE = int(_INFO.get('l2_cache_size', 256 * 1024))
+L3_SIZE = int(_INFO.get('llc_size', 8 * 1024 * 1024))
+
+# Уровень значимости для вывода об обрыве на границе L3
+ALPHA = 0.01
+
+# Реализации связываются один раз, без getattr на каждый замер
+_IMPLS = {
+    'none': ultrabase64.encode_no_prefetch,
+    't0': lambda data: ultrabase64.encode_prefetch_t0(data, PREFETCH_DISTANCE),
+    'nta': lambda data: ultrabase64.encode_prefetch_nta(data, PREFETCH_DISTANCE),
+}
+
+def benchmark_variant(func, data):
+    """Скорость кодирования (MB/s) по медиане, MAD в процентах от медианы и
+    скорости всех серий замера (для проверки значимости)."""
+
+    # Прогрев (1 раз)
+    func(data)
+
+    times_ns = measure(func, data)
+    median_ns, mad_ns = median_mad(times_ns)
+    size_mb = len(data) / (1024 * 1024)
+    speed = size_mb / (median_ns * 1e-9)
+    return speed, mad_ns / median_ns * 100, [size_mb / (t * 1e-9) for t in times_ns]
+
+def available_cpus():
+    """Номера ядер, на которых разрешено выполнять процесс."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def run_sizes(sizes):
+    """Замеряет размеры sizes в текущем процессе."""
+    results = []
+    for size_bytes in sizes:
+        data = get_test_data(size_bytes)
+        results.append((size_bytes,
+                        benchmark_variant(_IMPLS['none'], data),
+                        benchmark_variant(_IMPLS['t0'], data),
+                        benchmark_variant(_IMPLS['nta'], data)))
+    return results
+
+def run_sizes_pinned(cpu, sizes):
+    """Замеряет подмножество размеров в процессе-воркере, привязанном к ядру cpu.
+
+    Функция уровня модуля (pickle). Потоки здесь не подходят: GIL сериализует
+    замеры, а замеры в соседних потоках одного процесса мешают друг другу.
+    Приоритет и данные воркер наследует от родителя при fork.
+    """
+    # Кодировщики однопоточные - привязываем к ядру, чтобы не мигрировать между L2
+    pin_to_cpu(cpu)
+    return run_sizes(sizes)
+
+def fork_context():
+    """Контекст fork, где он есть: воркеры наследуют заполненный буфер данных
+    (copy-on-write) вместо заполнения своих 100 MB. Без fork (Windows, macOS
+    по умолчанию) каждый воркер генерирует данные сам."""
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+def report_cliff(name, results, index):
+    """Сравнивает зону 1 (<= L2) и зону 3 (> L3) t-тестом Уэлча по сериям замера."""
+    zone1 = [s for r in results if r[0] <= L2_SIZE for s in r[index][2]]
+    zone3 = [s for r in results if r[0] > L3_SIZE for s in r[index][2]]
+    if len(zone1) < 2 or len(zone3) < 2:
+        print(f"{name:<12} not enough sizes on both sides of the L3 boundary")
+        return
+
+    t, p = welch_ttest(zone1, zone3)
+    d = cohens_d(zone1, zone3)
+    q1 = statistics.quantiles(zone1)
+    q3 = statistics.quantiles(zone3)
+    print(f"{name:<12} zone 1 {q1[1]:>8.2f} MB/s [{q1[0]:.2f}-{q1[2]:.2f}]  "
+          f"zone 3 {q3[1]:>8.2f} MB/s [{q3[0]:.2f}-{q3[2]:.2f}]")
+    if p < ALPHA and t > 0:
+        print(f"{'':<12} 📉 Cache cliff detected at p={p:.2g} (t={t:.2f}, Cohen's d={d:.2f})")
+    else:
+        print(f"{'':<12} ✅ No significant cache cliff (p={p:.2g}, t={t:.2f}, Cohen's d={d:.2f})")
+
+def build_sizes():
+    """Сетка размеров от L2/8 до 4x L3 (не больше MAX_DATA_SIZE).
+
+    До L3 - шаг x2, выше L3 - шаг x sqrt(2), чтобы в зоне 3 было несколько
+    точек. Границы L2 и L3 входят в сетку, если не превышают MAX_DATA_SIZE.
+    """
+    top = min(4 * L3_SIZE, MAX_DATA_SIZE)
+    sizes = {min(L2_SIZE, top), min(L3_SIZE, top), top}
+
+    size = max(L2_SIZE // 8, 4 * 1024)
+    while size < min(L3_SIZE, top):
+        sizes.add(size)
+        size *= 2
+
+    # Над L3 размеры округляются до мегабайта, чтобы в таблице были целые MB
+    mb = 1024 * 1024
+    for step in range(1, 4):
+        size = round(L3_SIZE * 2 ** (step / 2) / mb) * mb
+        if size < top:
+            sizes.add(size)
+    return sorted(sizes)
+
+def format_size(size_bytes):
+    if size_bytes < 1024 * 1024:
+        return f"{size_bytes // 1024} KB"
+    return f"{size_bytes / (1024 * 1024):g} MB"
+
+def main():
+    sizes = build_sizes()
+
+    cpus = available_cpus()
+    workers = min(len(cpus), len(sizes)) if "--parallel" in sys.argv[1:] else 1
+
+    # Один раз до запуска воркеров: приоритет (os.nice наследуется при fork)
+    # с единственным предупреждением, если поднять его нельзя, и данные
+    pin_and_prioritize(cpu=cpus[0] if workers == 1 else None)
+    get_test_data(sizes[-1])
+
+    print("🔬 Cache Boundary Test: software prefetch vs hardware prefetcher")
+    print(f"Prefetch distance: {PREFETCH_DISTANCE} bytes")
+    print(f"Workers: {workers} (CPUs {', '.join(map(str, cpus[:workers]))})")
+    print(f"Sizes: {format_size(sizes[0])} - {format_size(sizes[-1])} "
+          f"(L2 {format_size(L2_SIZE)}, L3 {format_size(L3_SIZE)})")
+    if sizes[-1] <= L3_SIZE:
+        # Например, серверный LLC в сотни мегабайт: обрыв на границе L3 не измерить
+        print(f"⚠️  Zone 3 is empty: L3 ({format_size(L3_SIZE)}) is not below the "
+              f"largest test size ({format_size(MAX_DATA_SIZE)}), the L3 cliff is not measured")
+    print("=" * 95)
+    print(f"{'Size':<10} {'No prefetch':<18} {'T0':<18} {'NTA':<18} {'T0 / NTA vs none':<20}")
+    print("-" * 95)
+
+    sys.stdout.flush()
+
+    if workers == 1:
+        results = run_sizes(sizes)
+    else:
+        # Размеры раздаются по кругу: крупные не скапливаются у одного воркера
+        with ProcessPoolExecutor(max_workers=workers, mp_context=fork_context()) as pool:
+            futures = [pool.submit(run_sizes_pinned, cpus[w], sizes[w::workers])
+                       for w in range(workers)]
+            results = sorted(r for future in futures for r in future.result())
+
+    rows = []
+    for size_bytes, (none_speed, none_mad, _), (t0_speed, t0_mad, _), (nta_speed, nta_mad, _) in results:
+        t0_gain = (t0_speed / none_speed - 1) * 100
+        nta_gain = (nta_speed / none_speed - 1) * 100
+
+        cells = [f"{speed:>8.2f} {'±' + f'{mad:.1f}%':<9}"
+                 for speed, mad in ((none_speed, none_mad), (t0_speed, t0_mad), (nta_speed, nta_mad))]
+        rows.append(f"{format_size(size_bytes):<10} {cells[0]} {cells[1]} {cells[2]} "
+                    f"{t0_gain:+.1f}% / {nta_gain:+.1f}%")
+
+    # Строки таблицы выводятся одной записью после замеров: вывод в консоль
+    # между точками замера возмущает кэш и добавляет системные вызовы
+    sys.stdout.write("\n".join(rows) + "\n")
+    sys.stdout.flush()
+
+    # Вывод об обрыве: зона 1 против зоны 3 по всем сериям, а не по средним
+    print("=" * 95)
+    print(f"Cache cliff (Welch's t-test, zone 1 <= {format_size(L2_SIZE)} vs "
+          f"zone 3 > {format_size(L3_SIZE)}, alpha={ALPHA}):")
+    for index, name in ((1, 'No prefetch'), (2, 'T0'), (3, 'NTA')):
+        report_cliff(name, results, index)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 """Проверка совместимости API с популярными base64 библиотеками."""
 
+import array
 import base64  # stdlib
+import mmap
 import ultrabase64
 
+from bench_utils import get_test_data, measure, median_mad
+
 try:
     import fastbase64
     HAS_FASTBASE64 = True
@@ -11,6 +15,13 @@ except ImportError:
     HAS_FASTBASE64 = False
     print("⚠️  fastbase64 not installed (optional)")
 
+try:
+    from _numba_encode import encode_numba
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+    print("⚠️  numba not installed (optional reference encoder)")
+
 print("=" * 80)
 print("🔍 API Compatibility Check")
 print("=" * 80)
@@ -40,6 +51,8 @@ print("-" * 80)
 print("Available functions:")
 print("  - ultrabase64.encode(data) -> str")
 print("  - ultrabase64.encode_bytes(data) -> bytes")
+print("  - ultrabase64.encode_into(data, out) -> int")
+print("  - ultrabase64.encode_many(items) -> list[str]")
 print("  - ultrabase64.encode_auto(data) -> str")
 print("  - ultrabase64.encode_pipeline_py(data) -> str")
 print("  - ultrabase64.decode(data) -> bytes")
@@ -78,6 +91,7 @@ print(f"   stdlib.b64encode:              bytes -> bytes")
 print(f"   fastbase64.standard_b64encode: bytes -> bytes" if HAS_FASTBASE64 else "   fastbase64: N/A")
 print(f"   ultrabase64.encode:            bytes -> str   ⚠️  DIFFERENT")
 print(f"   ultrabase64.encode_bytes:      bytes -> bytes ✅ COMPATIBLE")
+print(f"   ultrabase64 inputs:            any contiguous buffer (bytearray, memoryview, mmap, array)")
 print()
 
 print("2. Correctness Check:")
@@ -95,6 +109,15 @@ if HAS_FASTBASE64:
     correctness_ok = correctness_ok and (stdlib_result == fast_result)
     print(f"   stdlib vs fastbase64:     {'✅ MATCH' if stdlib_result == fast_result else '❌ MISMATCH'}")
 
+if HAS_NUMBA:
+    # Независимая эталонная реализация: сверка побайтно на разных длинах
+    numba_ok = all(
+        encode_numba(test_data[:n]) == base64.b64encode(test_data[:n])
+        for n in range(len(test_data) + 1)
+    )
+    correctness_ok = correctness_ok and numba_ok
+    print(f"   stdlib vs numba reference: {'✅ MATCH' if numba_ok else '❌ MISMATCH'}")
+
 print(f"   stdlib vs ultrabase64:    {'✅ MATCH' if stdlib_result == ultra_result else '❌ MISMATCH'}")
 print(f"   stdlib vs ultra.encode_bytes: {'✅ MATCH' if stdlib_result == ultra_bytes_result else '❌ MISMATCH'}")
 print()
@@ -116,6 +139,48 @@ if HAS_FASTBASE64:
 print(f"   stdlib vs ultrabase64:    {'✅ MATCH' if stdlib_decoded == ultra_decoded else '❌ MISMATCH'}")
 print()
 
+print("4. Buffer Protocol Inputs (zero-copy):")
+print("-" * 80)
+
+# Любой непрерывный буфер кодируется на месте, без bytes(...)
+mapped = mmap.mmap(-1, len(test_data))
+mapped.write(test_data)
+buffer_inputs = {
+    'bytearray': bytearray(test_data),
+    'memoryview': memoryview(test_data),
+    "array.array('B')": array.array('B', test_data),
+    'mmap.mmap': mapped,
+}
+
+buffer_ok = True
+for name, buffer_input in buffer_inputs.items():
+    match = ultrabase64.encode(buffer_input) == stdlib_result
+    buffer_ok = buffer_ok and match
+    print(f"   {name + ':':<26}{'✅ MATCH' if match else '❌ MISMATCH'}")
+mapped.close()
+print()
+
+print("5. Encode Throughput (timeit, median of 7 autoranged series):")
+print("-" * 80)
+
+# Одна и та же точка вызова: bytes -> bytes у всех реализаций
+encoders = {'stdlib': base64.b64encode, 'ultrabase64': ultrabase64.encode_bytes}
+if HAS_FASTBASE64:
+    encoders['fastbase64'] = fastbase64.standard_b64encode
+if HAS_NUMBA:
+    encoders['numba'] = encode_numba
+
+for size in (100, 4096, 1_000_000):
+    data = bytes(get_test_data(size))
+    speeds = {}
+    for name, func in encoders.items():
+        func(data)  # прогрев (и JIT-компиляция для numba)
+        median_ns, _ = median_mad(measure(func, data))
+        speeds[name] = size / median_ns * 1e3  # MB/s
+    cells = ", ".join(f"{name} {speed:.0f} MB/s" for name, speed in speeds.items())
+    print(f"   {size:>9,} B: {cells}; ultrabase64 {speeds['ultrabase64'] / speeds['stdlib']:.1f}x stdlib")
+print()
+
 print("=" * 80)
 print("📋 Drop-in Replacement Guide:")
 print("=" * 80)
@@ -167,7 +232,7 @@ print("=" * 80)
 print("🎯 Summary:")
 print("=" * 80)
 print()
-if correctness_ok and decode_ok:
+if correctness_ok and decode_ok and buffer_ok:
     print("✅ All outputs are CORRECT and COMPATIBLE")
     print("✅ ultrabase64.encode_bytes() is drop-in replacement for stdlib/fastbase64")
     print("✅ ultrabase64.encode() provides convenient str output")
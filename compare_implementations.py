@@ -1,66 +1,83 @@
 #!/usr/bin/env python3
 """Сравнение производительности Rayon vs Pipeline реализаций."""
 
-import os
-import time
+import statistics
+import sys
+
 import ultrabase64
 
-def benchmark_implementation(func_name, data):
-    """Бенчмарк конкретной реализации."""
-    func = getattr(ultrabase64, func_name)
+from bench_utils import get_test_data, measure, median_mad, pin_and_prioritize
 
-    # Прогрев (1 раз)
-    _ = func(data)
+# Rayon замеряется напрямую: encode() выбирает стратегию по размеру и
+# с PIPELINE_THRESHOLD (20MB) сам переходит на Pipeline
+_RAYON_THREADS = int(ultrabase64.get_info()['available_cpus'])
+
+# Реализации связываются один раз, без getattr на каждый замер: функция и
+# дополнительные аргументы после data. Число потоков передаётся аргументом,
+# а не через lambda, чтобы измеряемый вызов обеих колонок стоил одинаково
+_IMPLS = {
+    'rayon': (ultrabase64.encode_with_threads, (_RAYON_THREADS,)),
+    'encode_pipeline_py': (ultrabase64.encode_pipeline_py, ()),
+}
 
-    # Основной тест - 3 итерации
-    times = []
-    for _ in range(3):
-        start = time.perf_counter()
-        result = func(data)
-        end = time.perf_counter()
-        times.append(end - start)
+def benchmark_implementation(impl, data):
+    """Бенчмарк конкретной реализации: медиана и MAD времени вызова (секунды)."""
+    func, args = impl
+
+    # Прогрев (1 раз)
+    result = func(data, *args)
 
-    # Берем лучшее время
-    best_time = min(times)
-    return best_time, len(result)
+    # Основной тест - серии по >= 0.2 с (timeit autorange), 7 повторов
+    median_ns, mad_ns = median_mad(measure(func, data, *args))
+    return median_ns * 1e-9, mad_ns * 1e-9, len(result)
 
 def compare_at_size(size_mb):
     """Сравнивает обе реализации на данном размере."""
     size_bytes = size_mb * 1024 * 1024
-    data = os.urandom(size_bytes)
+    data = get_test_data(size_bytes)
 
     # Тестируем обе реализации
-    rayon_time, rayon_len = benchmark_implementation('encode', data)
-    pipeline_time, pipeline_len = benchmark_implementation('encode_pipeline_py', data)
+    rayon_time, rayon_mad, rayon_len = benchmark_implementation(_IMPLS['rayon'], data)
+    pipeline_time, pipeline_mad, pipeline_len = benchmark_implementation(_IMPLS['encode_pipeline_py'], data)
 
     # Проверяем корректность
     if rayon_len != pipeline_len:
         return None, None, None, "ERROR: Different output lengths!"
 
-    rayon_speed = size_mb / rayon_time
-    pipeline_speed = size_mb / pipeline_time
+    # Скорость по медиане, MAD - в процентах от медианы
+    rayon = (size_mb / rayon_time, rayon_mad / rayon_time * 100)
+    pipeline = (size_mb / pipeline_time, pipeline_mad / pipeline_time * 100)
     speedup = (rayon_time / pipeline_time - 1) * 100  # % разница
 
-    return rayon_speed, pipeline_speed, speedup, None
+    return rayon, pipeline, speedup, None
 
 def main():
+    # Без привязки к ядру: реализации многопоточные
+    pin_and_prioritize()
+
     print("🔬 Rayon vs Pipeline Implementation Benchmark")
-    print("=" * 80)
-    print(f"{'Size':<10} {'Rayon (MB/s)':<15} {'Pipeline (MB/s)':<18} {'Difference':<15}")
-    print("-" * 80)
+    print("=" * 95)
+    print(f"{'Size':<10} {'Rayon (MB/s)':<15} {'MAD':<8} {'Pipeline (MB/s)':<18} {'MAD':<8} {'Difference':<15}")
+    print("-" * 95)
 
     # Тестируем размеры от 5MB до 100MB
     sizes = [5, 10, 15, 20, 25, 30, 40, 50, 60, 70, 80, 90, 100]
 
+    sys.stdout.flush()
+
     results = []
+    rows = []
     for size_mb in sizes:
         try:
-            rayon_speed, pipeline_speed, speedup, error = compare_at_size(size_mb)
+            rayon, pipeline, speedup, error = compare_at_size(size_mb)
 
             if error:
-                print(f"{size_mb:>3} MB     {error}")
+                rows.append(f"{size_mb:>3} MB     {error}")
                 continue
 
+            rayon_speed, rayon_mad = rayon
+            pipeline_speed, pipeline_mad = pipeline
+
             # Определяем кто быстрее
             if speedup > 0:
                 diff_str = f"Pipeline +{speedup:.1f}%"
@@ -69,7 +86,10 @@ def main():
             else:
                 diff_str = "Equal"
 
-            print(f"{size_mb:>3} MB     {rayon_speed:>8.2f}       {pipeline_speed:>8.2f}          {diff_str}")
+            rayon_mad_str = f"±{rayon_mad:.1f}%"
+            pipeline_mad_str = f"±{pipeline_mad:.1f}%"
+            rows.append(f"{size_mb:>3} MB     {rayon_speed:>8.2f}        {rayon_mad_str:<9}"
+                        f"{pipeline_speed:>8.2f}           {pipeline_mad_str:<9}{diff_str}")
 
             results.append({
                 'size': size_mb,
@@ -79,7 +99,12 @@ def main():
             })
 
         except Exception as e:
-            print(f"{size_mb:>3} MB     ERROR: {e}")
+            rows.append(f"{size_mb:>3} MB     ERROR: {e}")
+
+    # Строки таблицы выводятся одной записью после замеров: вывод в консоль
+    # между точками замера возмущает кэш и добавляет системные вызовы
+    sys.stdout.write("\n".join(rows) + "\n")
+    sys.stdout.flush()
 
     # Анализ результатов
     if results:
@@ -87,11 +112,8 @@ def main():
         print("📊 Analysis:")
         print("-" * 80)
 
-        avg_rayon = sum(r['rayon'] for r in results) / len(results)
-        avg_pipeline = sum(r['pipeline'] for r in results) / len(results)
-
-        print(f"Average Rayon speed:    {avg_rayon:.2f} MB/s")
-        print(f"Average Pipeline speed: {avg_pipeline:.2f} MB/s")
+        print(f"Average Rayon speed:    {statistics.mean(r['rayon'] for r in results):.2f} MB/s")
+        print(f"Average Pipeline speed: {statistics.mean(r['pipeline'] for r in results):.2f} MB/s")
         print()
 
         # Находим оптимальный размер для каждого подхода
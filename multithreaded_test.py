@@ -4,6 +4,8 @@ Comprehensive test suite for ultrabase64
 """
 
 import base64
+import ctypes
+import os
 import random
 import time
 import sys
@@ -29,15 +31,17 @@ def test_multithreaded_correctness():
         3000,   # Не кратно 3
         3003,   # Кратно 3
         100_000,    # 100KB
-        1_000_000,  # 1MB - порог многопоточности
+        1_000_000,  # 1MB
         2_000_001,  # >1MB, не кратно 3
-        5_000_004,  # >1MB, кратно 3
+        5_000_004,  # >4MB - порог многопоточности, кратно 3
+        9_000_001,  # >4MB, не кратно 3
     ]
     
     for size in test_sizes:
-        # Генерируем детерминированные тестовые данные
+        # Генерируем детерминированные тестовые данные. getrandbits реализован
+        # на C, как и randbytes, но есть и в Python 3.8
         random.seed(42)
-        test_data = bytes([random.randint(0, 255) for _ in range(size)])
+        test_data = random.getrandbits(8 * size).to_bytes(size, 'little')
         
         # Эталонное кодирование
         expected = base64.b64encode(test_data).decode('utf-8')
@@ -71,18 +75,20 @@ def test_performance_scaling():
     # Большие данные для тестирования многопоточности
     size = 10 * 1024 * 1024  # 10MB
     random.seed(42)
-    test_data = bytes([random.randint(0, 255) for _ in range(size)])
+    test_data = random.getrandbits(8 * size).to_bytes(size, 'little')
     
     print(f"Testing with {size // (1024*1024)}MB of data...")
     
     # Тестируем с разным количеством потоков
     thread_counts = [1, 2, 4, 8]
     times = {}
+    # Вход передаётся через memoryview: замеряется кодирование, а не разбор объекта
+    test_view = memoryview(test_data)
     
     for threads in thread_counts:
-        start_time = time.time()
-        result = ultrabase64.encode_with_threads(test_data, threads)
-        elapsed = time.time() - start_time
+        start_time = time.perf_counter()
+        result = ultrabase64.encode_with_threads(test_view, threads)
+        elapsed = time.perf_counter() - start_time
         times[threads] = elapsed
         
         # Проверяем корректность
@@ -157,6 +163,56 @@ def test_concurrent_access():
     for i, result in enumerate(results):
         assert result == test_data, f"Concurrent decode failed for worker {i}"
     
+    # Параллельность: encode отпускает GIL, поэтому потоки должны кодировать
+    # одновременно. Вход меньше MULTITHREAD_THRESHOLD - каждый вызов однопоточный.
+    # 256 KB помещаются в L2 каждого ядра: замер упирается в вычисления, а не
+    # в общую шину памяти, и не зависит от соседей по машине
+    random.seed(42)
+    payload_size = 256 * 1024
+    payload = random.getrandbits(8 * payload_size).to_bytes(payload_size, 'little')
+    calls_per_worker = 80
+    
+    def worker_repeat():
+        for _ in range(calls_per_worker):
+            ultrabase64.encode(payload)
+    
+    def run_sequential():
+        for _ in range(num_workers):
+            worker_repeat()
+    
+    def run_threaded():
+        threads = [threading.Thread(target=worker_repeat) for _ in range(num_workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    
+    # Лучший из нескольких прогонов: единичный замер на общей или
+    # троттлящейся машине может случайно попасть на чужую нагрузку
+    def best_time(run, trials=5):
+        times = []
+        for _ in range(trials):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        return min(times)
+    
+    sequential_time = best_time(run_sequential)
+    parallel_time = best_time(run_threaded)
+    
+    # sys._is_gil_enabled() появился в 3.13 (free-threaded сборки, PEP 703)
+    gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    print(f"  {num_workers} threads: {parallel_time:.3f}s, sequential: {sequential_time:.3f}s "
+          f"(x{parallel_time / sequential_time:.2f}; {cpus} CPUs, "
+          f"GIL {'enabled' if gil_enabled else 'disabled'})")
+    # Граница с запасом: на 4 ядрах идеал - 0.25, при сериализации GIL - около 1.0.
+    # Замер по времени, поэтому проверка только по запросу (ULTRABASE64_TIMING_ASSERTS=1):
+    # на общих CI-раннерах она срабатывала бы не из-за кода
+    if cpus >= 4 and os.environ.get("ULTRABASE64_TIMING_ASSERTS") == "1":
+        assert parallel_time < 0.8 * sequential_time, \
+            "Concurrent encode did not run in parallel (is the GIL released?)"
+    
     print("✅ Concurrent access test passed")
 
 def test_error_handling():
@@ -199,6 +255,7 @@ def test_library_info():
     print(f"  Max threads: {info['max_threads']}")
     print(f"  Max input size: {info['max_input_size']} bytes")
     print(f"  Available CPUs: {info['available_cpus']}")
+    print(f"  Selected implementation: {info['selected_impl']}")
     
     # Проверяем, что константы доступны
     assert hasattr(ultrabase64, 'MULTITHREAD_THRESHOLD')
@@ -206,6 +263,65 @@ def test_library_info():
     
     print("✅ Library info test passed")
 
+# Буфер для вытеснения кэшей: вдвое больше LLC, определённого библиотекой
+# (по умолчанию как у i7-7700: 8MB), но не больше MAX_INPUT_SIZE
+EVICT_SIZE = min(2 * int(ultrabase64.get_info().get('llc_size', 8 * 1024 * 1024)),
+                 ultrabase64.MAX_INPUT_SIZE)
+
+# Шаг записи: memset в glibc для больших блоков переходит на потоковые
+# store в обход кэша, которые ничего бы не вытеснили
+EVICT_STEP = 64 * 1024
+
+# Выделяется один раз при первом вытеснении
+_evict_buf = None
+
+def evict_caches():
+    """Вытесняет вход и вывод прошлого замера из кэшей.
+
+    Записывает каждую линию заранее выделенного буфера (memset блоками по
+    EVICT_STEP): без выделения памяти и шума аллокатора прямо перед замером.
+    """
+    global _evict_buf
+    if _evict_buf is None:
+        _evict_buf = (ctypes.c_char * EVICT_SIZE)()
+    base = ctypes.addressof(_evict_buf)
+    for offset in range(0, EVICT_SIZE, EVICT_STEP):
+        ctypes.memset(base + offset, 0xA5, min(EVICT_STEP, EVICT_SIZE - offset))
+
+def time_per_call(func, data, budget=0.05, evict=False):
+    """Минимальное время одного вызова func(data), в секундах.
+
+    Число вызовов в замере подбирается удвоением, пока замер не станет
+    длиннее 1ms (малые размеры короче разрешения таймера), затем замеры
+    повторяются, пока их сумма не превысит budget секунд (не меньше 5).
+    С evict перед каждым замером кэши вытесняются - замеряется холодный кэш
+    (при нескольких вызовах в замере холодный только первый).
+    """
+    loops = 1
+    while True:
+        if evict:
+            evict_caches()
+        start = time.perf_counter()
+        for _ in range(loops):
+            func(data)
+        elapsed = time.perf_counter() - start
+        if elapsed >= 1e-3:
+            break
+        loops *= 2
+
+    times = [elapsed / loops]
+    spent = elapsed
+    while spent < budget or len(times) < 5:
+        if evict:
+            evict_caches()
+        start = time.perf_counter()
+        for _ in range(loops):
+            func(data)
+        elapsed = time.perf_counter() - start
+        times.append(elapsed / loops)
+        spent += elapsed
+    return min(times)  # Берем лучший результат
+
 def benchmark_comparison():
     """Детальное сравнение производительности"""
     print("🏎️  Running detailed performance benchmark...")
@@ -218,33 +334,25 @@ def benchmark_comparison():
     for size in sizes:
         # Генерируем тестовые данные
         random.seed(42)
-        data = bytes([random.randint(0, 255) for _ in range(size)])
+        data = random.getrandbits(8 * size).to_bytes(size, 'little')
+        
+        view = memoryview(data)
         
         # Прогреваем
-        ultrabase64.encode(data)
+        ultrabase64.encode_bytes(view)
         base64.b64encode(data)
         
-        # Наша библиотека (3 итерации для точности)
-        times_ours = []
-        for _ in range(3):
-            start = time.time()
-            ultrabase64.encode(data)
-            times_ours.append(time.time() - start)
-        our_time = min(times_ours)  # Берем лучший результат
-        
-        # Стандартная библиотека
-        times_std = []
-        for _ in range(3):
-            start = time.time()
-            base64.b64encode(data)
-            times_std.append(time.time() - start)
-        std_time = min(times_std)
+        # Наша библиотека и стандартная: минимум по замерам на ~50ms,
+        # с холодным кэшем перед каждым замером. encode_bytes() возвращает
+        # bytes, как и b64encode, - сравнивается одинаковая работа
+        our_time = time_per_call(ultrabase64.encode_bytes, view, evict=True)
+        std_time = time_per_call(base64.b64encode, data, evict=True)
         
         speedup = std_time / our_time if our_time > 0 else float('inf')
         throughput = size / our_time / (1024*1024) if our_time > 0 else 0  # MB/s
         
         size_str = f"{size//1024}KB" if size < 1024*1024 else f"{size//(1024*1024)}MB"
-        print(f"{size_str:<12}\t{our_time:.4f}s\t{std_time:.4f}s\t{speedup:.2f}x\t{throughput:.1f} MB/s")
+        print(f"{size_str:<12}\t{our_time:.6f}s\t{std_time:.6f}s\t{speedup:.2f}x\t{throughput:.1f} MB/s")
 
 def main():
     """Main test function"""
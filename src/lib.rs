@@ -1,23 +1,41 @@
 // src/lib.rs - СТАБИЛЬНАЯ ВЕРСИЯ ДЛЯ PyO3 0.21
 use pyo3::prelude::*;
-use pyo3::types::PyBytes;
+use pyo3::ffi;
+use pyo3::buffer::PyBuffer;
+use pyo3::types::{PyBytes, PyList, PyString};
 use rayon::prelude::*;
 use base64::{Engine as _, engine::general_purpose};
-use std::sync::OnceLock;
+use std::sync::{mpsc, Arc, Mutex, OnceLock};
 use std::fs::File;
 use std::io::{BufReader, BufWriter, Read, Write};
+use std::time::Instant;
+
+mod simd;
 
 // --- Константы и конфигурации ---
 
 /// Порог в байтах, после которого имеет смысл включать многопоточность.
-/// 1MB - более реалистичный порог для современных систем.
-const MULTITHREAD_THRESHOLD: usize = 1024 * 1024;
+/// Ниже 4MB однопоточный SIMD уже упирается в пропускную способность памяти,
+/// и раздача задач потокам Rayon стоит больше, чем даёт.
+const MULTITHREAD_THRESHOLD: usize = 4 * 1024 * 1024;
+
+/// Порог в байтах, после которого encode() переключается с Rayon на Pipeline.
+/// За пределами L3 cache конвейер на постоянном пуле стабильнее.
+const PIPELINE_THRESHOLD: usize = 20 * 1024 * 1024;
 
 /// Минимальный размер чанка для многопоточной обработки.
 /// 1MB оптимально для L3 cache (обычно 1-2MB на ядро в современных CPU).
 /// Это минимизирует cache misses и амортизирует overhead многопоточности.
 const MIN_CHUNK_SIZE: usize = 1024 * 1024; // 1MB
 
+/// Шаг стыков между участками потоков во входных байтах: 96 байт входа дают
+/// 128 байт вывода (пара кэш-линий, которую забирает L2 streamer на x86_64).
+/// Кратно 3 (без padding внутри основной части) и 48 (шаг AVX-512 kernel-ов).
+const SEAM_ALIGN: usize = 96;
+
+/// Размер чанка Rayon: 2MB (около L2 современного ядра), кратно SEAM_ALIGN.
+const RAYON_CHUNK_SIZE: usize = 2 * 1024 * 1024 / SEAM_ALIGN * SEAM_ALIGN;
+
 /// Максимальное количество потоков для кодирования.
 const MAX_THREADS: usize = 8;
 
@@ -29,9 +47,6 @@ const MAX_INPUT_SIZE: usize = 100 * 1024 * 1024; // 100MB
 /// Кастомный Base64 engine без padding для параллельной обработки.
 static NO_PAD_ENGINE: OnceLock<base64::engine::GeneralPurpose> = OnceLock::new();
 
-/// Кешированное количество доступных CPU для избежания повторных системных вызовов.
-static OPTIMAL_THREADS: OnceLock<usize> = OnceLock::new();
-
 fn get_no_pad_engine() -> &'static base64::engine::GeneralPurpose {
     NO_PAD_ENGINE.get_or_init(|| {
         base64::engine::GeneralPurpose::new(
@@ -41,188 +56,531 @@ fn get_no_pad_engine() -> &'static base64::engine::GeneralPurpose {
     })
 }
 
-/// Получает оптимальное количество потоков (кешированное).
-fn get_optimal_threads() -> usize {
-    *OPTIMAL_THREADS.get_or_init(|| num_cpus::get().min(MAX_THREADS))
+/// Кешированное количество доступных CPU (с учётом affinity и cgroup-квот).
+static AVAILABLE_CPUS: OnceLock<usize> = OnceLock::new();
+
+/// Получает количество доступных CPU (кешированное).
+fn get_available_cpus() -> usize {
+    *AVAILABLE_CPUS.get_or_init(|| {
+        std::thread::available_parallelism().map_or(1, |n| n.get())
+    })
+}
+
+/// Пул потоков, привязанный к процессу, в котором он создан.
+///
+/// После fork() в дочернем процессе остаётся только вызвавший fork поток:
+/// пул родителя там - структура без потоков, и задача в нём ждала бы вечно
+/// (multiprocessing на Linux, gunicorn --preload, ProcessPoolExecutor).
+/// При смене PID пул создаётся заново, а старый забывается без деструктора:
+/// потоков, которым тот послал бы сигнал завершения, уже нет.
+struct ForkSafePool<T> {
+    slot: Mutex<Option<(u32, Arc<T>)>>,
+}
+
+impl<T> ForkSafePool<T> {
+    const fn new() -> Self {
+        ForkSafePool { slot: Mutex::new(None) }
+    }
+
+    /// Пул текущего процесса; `init` создаёт его при первом вызове после
+    /// запуска или fork().
+    fn get_or_init(&self, init: impl FnOnce() -> T) -> Arc<T> {
+        let pid = std::process::id();
+        let mut slot = self.slot.lock().unwrap_or_else(|e| e.into_inner());
+        if let Some((owner, pool)) = slot.as_ref() {
+            if *owner == pid {
+                return Arc::clone(pool);
+            }
+        }
+        if let Some(stale) = slot.take() {
+            std::mem::forget(stale);
+        }
+        let pool = Arc::new(init());
+        *slot = Some((pid, Arc::clone(&pool)));
+        pool
+    }
+}
+
+/// Пул Rayon для encode() и encode_with_threads(): собственный, а не
+/// глобальный - глобальный пул нельзя пересоздать после fork().
+static RAYON_POOL: ForkSafePool<rayon::ThreadPool> = ForkSafePool::new();
+
+/// Получает пул Rayon (по потоку на доступный CPU) текущего процесса.
+fn get_rayon_pool() -> Arc<rayon::ThreadPool> {
+    RAYON_POOL.get_or_init(|| {
+        rayon::ThreadPoolBuilder::new()
+            .num_threads(get_available_cpus())
+            .thread_name(|i| format!("ultrabase64-rayon-{}", i))
+            .build()
+            .expect("failed to build Rayon thread pool")
+    })
 }
 
 // --- Внутренние функции ---
 
-/// Оптимизированная реализация многопоточного кодирования.
-/// Параметр _num_threads сохранен для обратной совместимости, но не используется -
-/// Rayon автоматически использует оптимальное количество потоков через work-stealing.
-fn encode_multithreaded(input: &[u8], _num_threads: usize) -> String {
+/// Длина Base64 вывода (с padding) для входных данных длины `n`.
+fn encoded_len(n: usize) -> usize {
+    (n + 2) / 3 * 4
+}
+
+/// Многопоточное кодирование напрямую в выходной буфер.
+/// Длина `out` должна быть равна `encoded_len(input.len())`.
+/// Каждый чанк пишется в свой непересекающийся участок `out` - без промежуточных
+/// строк и без финальной конкатенации.
+/// `stream`: вывод пишется потоковыми store в обход кэша (как в encode_pipeline_into()).
+/// Каждый чанк выравнивается по 64 байтам и завершается sfence внутри
+/// simd::encode_slice_streaming() в своём потоке, до возврата из Rayon.
+fn encode_multithreaded_into(input: &[u8], out: &mut [u8], stream: bool) {
     let len = input.len();
-    if len == 0 {
-        return String::new();
-    }
+    let encode_part: fn(&[u8], &mut [u8]) = if stream {
+        simd::encode_slice_streaming
+    } else {
+        simd::encode_slice
+    };
 
     // 1. РАЗДЕЛЯЕМ ДАННЫЕ НА ОСНОВНУЮ ЧАСТЬ И "ХВОСТ"
     let remainder_len = len % 3;
     let main_part_len = len - remainder_len;
 
     // 2. ПРОВЕРЯЕМ МИНИМАЛЬНЫЙ РАЗМЕР ДЛЯ МНОГОПОТОЧНОСТИ
-    // Если данных меньше чем MIN_CHUNK_SIZE * 2, fallback на single-threaded
-    if main_part_len < MIN_CHUNK_SIZE * 2 {
-        return general_purpose::STANDARD.encode(input);
+    // Если данных меньше двух чанков или CPU один, fallback на single-threaded
+    if main_part_len < RAYON_CHUNK_SIZE * 2 || get_available_cpus() < 2 {
+        encode_part(input, out);
+        return;
     }
 
     let (main_part, tail_part) = input.split_at(main_part_len);
+    let (main_out, tail_out) = out.split_at_mut(main_part_len / 3 * 4);
 
-    // 3. ИСПОЛЬЗУЕМ ФИКСИРОВАННЫЙ CHUNK SIZE ДЛЯ ОПТИМАЛЬНОГО L3 CACHE
-    // Rayon автоматически распределит чанки между потоками через work-stealing.
-    // Фиксированный 1MB чанк оптимален для большинства CPU (L3 cache = 1-2MB/core).
-    // ВАЖНО: chunk_size ДОЛЖЕН быть кратен 3 для корректного Base64 кодирования.
-    let chunk_size = (MIN_CHUNK_SIZE / 3) * 3;
-
-    // 4. ПАРАЛЛЕЛЬНО КОДИРУЕМ ОСНОВНУЮ ЧАСТЬ (без padding'а)
-    let no_pad_engine = get_no_pad_engine();
-    let encoded_parts: Vec<String> = main_part
-        .par_chunks(chunk_size)
-        .map(|chunk| no_pad_engine.encode(chunk))
-        .collect();
-
-    // 5. ЭФФЕКТИВНАЯ КОНКАТЕНАЦИЯ: предвычисляем размер для единой аллокации
-    let total_len: usize = encoded_parts.iter().map(|s| s.len()).sum();
-    let tail_encoded = if !tail_part.is_empty() {
-        general_purpose::STANDARD.encode(tail_part)
-    } else {
-        String::new()
-    };
+    // Короткая голова доводит начало чанков до границы 128 байт вывода
+    let head_len = aligned_head_len(main_part.len(), main_out);
+    let (head, main_part) = main_part.split_at(head_len);
+    let (head_out, main_out) = main_out.split_at_mut(head_len / 3 * 4);
+    encode_part(head, head_out);
 
-    let mut result = String::with_capacity(total_len + tail_encoded.len());
+    // 3. ИСПОЛЬЗУЕМ ФИКСИРОВАННЫЙ CHUNK SIZE, ПОМЕЩАЮЩИЙСЯ В L2
+    // Rayon автоматически распределит чанки между потоками через work-stealing.
+    // ВАЖНО: chunk_size ДОЛЖЕН быть кратен 3 для корректного Base64 кодирования,
+    // а кратность SEAM_ALIGN держит стыки чанков на разных кэш-линиях.
+    let chunk_size = RAYON_CHUNK_SIZE;
+
+    // 4. ПАРАЛЛЕЛЬНО КОДИРУЕМ ОСНОВНУЮ ЧАСТЬ прямо в свои участки вывода
+    // Длина чанков кратна 3, поэтому padding внутри основной части не появляется.
+    get_rayon_pool().install(|| {
+        main_part
+            .par_chunks(chunk_size)
+            .zip(main_out.par_chunks_mut(chunk_size / 3 * 4))
+            .for_each(|(chunk, chunk_out)| encode_part(chunk, chunk_out))
+    });
+
+    // 5. ХВОСТ (с padding'ом) пишем в конец буфера
+    if !tail_part.is_empty() {
+        encode_part(tail_part, tail_out);
+    }
+}
 
-    // Добавляем все части без реаллокаций
-    for part in encoded_parts {
-        result.push_str(&part);
+/// Сколько входных байт (кратно 3) закодировать отдельно перед участками
+/// потоков, чтобы их вывод начинался на границе 128 байт: тогда стыки участков,
+/// кратных SEAM_ALIGN, не делят кэш-линию между потоками (false sharing).
+/// Буфер, не выровненный по 4 байтам, не выравнивается.
+fn aligned_head_len(input_len: usize, out: &[u8]) -> usize {
+    let misalign = out.as_ptr() as usize % 128;
+    if misalign % 4 != 0 {
+        return 0;
     }
+    ((128 - misalign) % 128 / 4 * 3).min(input_len)
+}
 
-    if !tail_encoded.is_empty() {
-        result.push_str(&tail_encoded);
+/// Размер участка на каждый из `parts` потоков: поровну, с округлением вверх
+/// до SEAM_ALIGN (не меньше SEAM_ALIGN).
+fn seam_share(len: usize, parts: usize) -> usize {
+    let step = SEAM_ALIGN * parts;
+    ((len + step - 1) / step * SEAM_ALIGN).max(SEAM_ALIGN)
+}
+
+/// Многопоточное кодирование на `num_threads` равных участках (кратных SEAM_ALIGN;
+/// для малых данных участков может быть меньше). Как и в encode_multithreaded_into(),
+/// каждый участок пишется в свой непересекающийся участок `out`.
+/// Длина `out` должна быть равна `encoded_len(input.len())`.
+fn encode_split_into(input: &[u8], out: &mut [u8], num_threads: usize) {
+    let main_part_len = input.len() - input.len() % 3;
+    if num_threads < 2 || main_part_len == 0 {
+        simd::encode_slice(input, out);
+        return;
     }
 
-    result
+    let (main_part, tail_part) = input.split_at(main_part_len);
+    let (main_out, tail_out) = out.split_at_mut(main_part_len / 3 * 4);
+
+    let head_len = aligned_head_len(main_part.len(), main_out);
+    let (head, main_part) = main_part.split_at(head_len);
+    let (head_out, main_out) = main_out.split_at_mut(head_len / 3 * 4);
+    simd::encode_slice(head, head_out);
+
+    let share = seam_share(main_part.len(), num_threads);
+
+    get_rayon_pool().install(|| {
+        main_part
+            .par_chunks(share)
+            .zip(main_out.par_chunks_mut(share / 3 * 4))
+            .for_each(|(chunk, chunk_out)| simd::encode_slice(chunk, chunk_out))
+    });
+
+    if !tail_part.is_empty() {
+        simd::encode_slice(tail_part, tail_out);
+    }
 }
 
-/// Конвейерная реализация многопоточного кодирования с использованием channels.
-/// Использует явное управление потоками через crossbeam для более гибкого контроля.
+/// Единая стратегия кодирования для encode(), encode_auto(), encode_bytes()
+/// и encode_into(): выбор по размеру данных относительно кэшей.
+/// Длина `out` должна быть равна `encoded_len(input.len())`.
 ///
-/// Архитектура:
-/// - Фиксированные 1MB чанки (оптимально для L3 cache)
-/// - NUM_WORKERS потоков для параллельной обработки
-/// - Crossbeam channels для передачи работы и результатов
-/// - Pre-allocated output buffer для избежания реаллокаций
-/// - Прямая запись результатов по offset'ам (порядок не важен)
-/// - Scoped threads для работы с нестатическими ссылками (zero-copy!)
-fn encode_pipeline(input: &[u8]) -> String {
-    use crossbeam::channel;
+/// Ярусы по размеру выбирают способ распараллеливания; потоковые store - отдельное
+/// решение поверх любого яруса: когда рабочий набор (вход + вывод, ~7/3 входа)
+/// не помещается в LLC, вывод пишется в обход кэша и не вытесняет ещё не
+/// прочитанный вход (при L3 8MB - уже с ~3.5MB входа). Отдельных веток под L1/L2
+/// нет: SIMD ядро выбирается по возможностям CPU и быстрее scalar-пути на любом
+/// размере, а однопоточный ярус и так работает внутри кэша одного ядра.
+fn encode_to_slice(input: &[u8], out: &mut [u8]) {
+    let len = input.len();
+    let stream = len + out.len() > simd::cache_sizes().llc;
 
-    let n = input.len();
-    if n == 0 {
-        return String::new();
+    if len < MULTITHREAD_THRESHOLD {
+        // Для маленьких данных - single-threaded
+        if stream {
+            simd::encode_slice_streaming(input, out);
+        } else {
+            simd::encode_slice(input, out);
+        }
+    } else if len < PIPELINE_THRESHOLD {
+        // Для средних данных (4-20MB) - Rayon (оптимален для L3 cache)
+        encode_multithreaded_into(input, out, stream);
+    } else {
+        // Для больших данных (>20MB) - Pipeline (стабильнее вне cache)
+        encode_pipeline_into(input, out, stream);
     }
+}
 
-    const CHUNK_SIZE: usize = 1024 * 1024; // 1MB
-    const NUM_WORKERS: usize = 4;
-    const CHUNK_SIZE_ALIGNED: usize = (CHUNK_SIZE / 3) * 3; // Кратно 3
-
-    let remainder_len = n % 3;
-    let main_part_len = n - remainder_len;
+/// Медиана и MAD (median absolute deviation) выборки. Переупорядочивает `values`.
+fn median_mad(values: &mut [f64]) -> (f64, f64) {
+    fn median(sorted: &[f64]) -> f64 {
+        let mid = sorted.len() / 2;
+        if sorted.len() % 2 == 0 {
+            (sorted[mid - 1] + sorted[mid]) / 2.0
+        } else {
+            sorted[mid]
+        }
+    }
 
-    // Для небольших данных используем single-threaded
-    if main_part_len < CHUNK_SIZE * NUM_WORKERS {
-        return general_purpose::STANDARD.encode(input);
+    values.sort_by(|a, b| a.total_cmp(b));
+    let med = median(values);
+    for v in values.iter_mut() {
+        *v = (*v - med).abs();
     }
+    values.sort_by(|a, b| a.total_cmp(b));
+    (med, median(values))
+}
 
-    let (main_part, tail_part) = input.split_at(main_part_len);
+/// Задача для рабочего потока: закодировать участок входа в свой участок вывода.
+struct EncodeTask {
+    input: *const u8,
+    input_len: usize,
+    output: *mut u8,
+    /// Писать вывод потоковыми store (см. simd::encode_slice_streaming).
+    stream: bool,
+    done: mpsc::Sender<()>,
+}
 
-    let num_chunks = (main_part_len + CHUNK_SIZE_ALIGNED - 1) / CHUNK_SIZE_ALIGNED;
+// SAFETY: указатели ссылаются на буферы вызывающего потока, который не
+// возвращается, пока не получит `done` от всех задач; участки вывода не пересекаются.
+unsafe impl Send for EncodeTask {}
+
+/// Постоянный пул рабочих потоков для конвейерной реализации.
+/// Каждый поток блокируется на recv() своего канала (без нагрузки на CPU)
+/// и не участвует в work-stealing. Потоки живут до завершения процесса.
+struct WorkerPool {
+    senders: Vec<Mutex<mpsc::Sender<EncodeTask>>>,
+}
+
+/// Пул создаётся при первом вызове encode_pipeline_into() (и заново после fork()).
+static WORKER_POOL: ForkSafePool<WorkerPool> = ForkSafePool::new();
+
+/// Размер пула конвейерной реализации: по одному потоку на физическое ядро
+/// (SMT-сиблинги делят L1/L2 и не ускоряют потоковое кодирование).
+fn get_pipeline_workers() -> usize {
+    num_cpus::get_physical().clamp(1, MAX_THREADS)
+}
+
+/// Получает пул рабочих потоков текущего процесса (создаёт при первом вызове).
+fn get_worker_pool() -> Arc<WorkerPool> {
+    WORKER_POOL.get_or_init(|| {
+        let senders = (0..get_pipeline_workers())
+            .map(|i| {
+                let (task_tx, task_rx) = mpsc::channel::<EncodeTask>();
+                std::thread::Builder::new()
+                    .name(format!("ultrabase64-worker-{}", i))
+                    .spawn(move || {
+                        while let Ok(task) = task_rx.recv() {
+                            // SAFETY: см. EncodeTask
+                            let (input, output) = unsafe {
+                                (
+                                    std::slice::from_raw_parts(task.input, task.input_len),
+                                    std::slice::from_raw_parts_mut(task.output, encoded_len(task.input_len)),
+                                )
+                            };
+                            if task.stream {
+                                simd::encode_slice_streaming(input, output);
+                            } else {
+                                simd::encode_slice(input, output);
+                            }
+                            let _ = task.done.send(());
+                        }
+                    })
+                    .expect("failed to spawn worker thread");
+                Mutex::new(task_tx)
+            })
+            .collect();
+        WorkerPool { senders }
+    })
+}
 
-    // Pre-calculate total output size
-    let main_output_len = main_part_len / 3 * 4;
-    let tail_encoded = if !tail_part.is_empty() {
-        general_purpose::STANDARD.encode(tail_part)
+/// Конвейерная реализация многопоточного кодирования на постоянном пуле потоков.
+///
+/// Архитектура:
+/// - Пул создаётся один раз, потоки ждут задач на mpsc-канале (без work-stealing)
+/// - Активных потоков min(размер пула, число 1MB чанков)
+/// - Каждый поток получает один равный участок (кратный SEAM_ALIGN) и пишет его
+///   напрямую в pre-allocated output buffer - без промежуточных Vec
+/// - Вызывающий поток кодирует хвост и ждёт отчётов о завершении всех участков
+/// - `stream`: вывод пишется потоковыми store в обход кэша (данные больше LLC)
+///
+/// Длина `out` должна быть равна `encoded_len(input.len())`.
+fn encode_pipeline_into(input: &[u8], out: &mut [u8], stream: bool) {
+    let n = input.len();
+    let encode_part: fn(&[u8], &mut [u8]) = if stream {
+        simd::encode_slice_streaming
     } else {
-        String::new()
+        simd::encode_slice
     };
-    let total_output_len = main_output_len + tail_encoded.len();
 
-    // Pre-allocate output buffer
-    let mut output_buffer = vec![0u8; total_output_len];
+    const CHUNK_SIZE: usize = 1024 * 1024; // 1MB
 
-    // Channels: (chunk_idx, input_offset, input_length, output_offset)
-    let (work_sender, work_receiver) = channel::unbounded::<(usize, usize, usize, usize)>();
-    // Result: (chunk_idx, output_offset, encoded_data)
-    let (result_sender, result_receiver) = channel::unbounded::<(usize, usize, Vec<u8>)>();
+    let remainder_len = n % 3;
+    let main_part_len = n - remainder_len;
 
-    // Используем crossbeam::scope для scoped threads - позволяет работать с нестатическими ссылками!
-    crossbeam::scope(|s| {
-        // Spawn worker threads
-        for _ in 0..NUM_WORKERS {
-            let work_rx = work_receiver.clone();
-            let result_tx = result_sender.clone();
+    // Для небольших данных (меньше двух чанков на пул) используем single-threaded
+    let pool = get_worker_pool();
+    let num_workers = pool.senders.len().min(main_part_len / CHUNK_SIZE);
+    if num_workers < 2 {
+        encode_part(input, out);
+        return;
+    }
 
-            s.spawn(move |_| {
-                while let Ok((chunk_idx, input_offset, input_len, output_offset)) = work_rx.recv() {
-                    // Extract chunk from input (zero-copy slice - main_part borrowed from outer scope!)
-                    let chunk = &main_part[input_offset..input_offset + input_len];
+    let (main_part, tail_part) = input.split_at(main_part_len);
+    let (main_out, tail_out) = out.split_at_mut(main_part_len / 3 * 4);
+
+    // Голова до границы 128 байт вывода кодируется вызывающим потоком вместе с хвостом
+    let head_len = aligned_head_len(main_part.len(), main_out);
+    let (head, main_part) = main_part.split_at(head_len);
+    let (head_out, main_out) = main_out.split_at_mut(head_len / 3 * 4);
+
+    // Равные участки на каждый поток, кратные SEAM_ALIGN
+    let share = seam_share(main_part.len(), num_workers);
+
+    // Завершение отслеживается отдельным каналом на каждый вызов
+    let (done_tx, done_rx) = mpsc::channel::<()>();
+    let mut dispatched = 0;
+
+    for (sender, (chunk, chunk_out)) in pool.senders.iter()
+        .zip(main_part.chunks(share).zip(main_out.chunks_mut(share / 3 * 4)))
+    {
+        let task = EncodeTask {
+            input: chunk.as_ptr(),
+            input_len: chunk.len(),
+            output: chunk_out.as_mut_ptr(),
+            stream,
+            done: done_tx.clone(),
+        };
+        let sent = sender.lock().unwrap_or_else(|e| e.into_inner()).send(task);
+        match sent {
+            Ok(()) => dispatched += 1,
+            // Поток-получатель завершился - кодируем участок сами
+            Err(_) => encode_part(chunk, chunk_out),
+        }
+    }
+    drop(done_tx);
 
-                    // Encode without padding
-                    let encoded = get_no_pad_engine().encode(chunk);
+    // Голову и хвост (с padding'ом) кодируем, пока работают потоки
+    encode_part(head, head_out);
+    if !tail_part.is_empty() {
+        encode_part(tail_part, tail_out);
+    }
 
-                    // Send result with chunk_idx for debugging
-                    let _ = result_tx.send((chunk_idx, output_offset, encoded.into_bytes()));
-                }
-            });
-        }
+    // До возврата все задачи должны закончить запись в out
+    for _ in 0..dispatched {
+        done_rx.recv().expect("worker thread exited while encoding");
+    }
+}
 
-        // Send work to workers
-        for i in 0..num_chunks {
-            let start = i * CHUNK_SIZE_ALIGNED;
-            let end = (start + CHUNK_SIZE_ALIGNED).min(main_part_len);
-            let chunk_len = end - start;
-            let output_offset = start / 3 * 4;
+/// Быстрая проверка корректности Base64 строки.
+fn is_valid_base64_length(len: usize) -> bool {
+    len % 4 == 0 || len == 0
+}
 
-            let _ = work_sender.send((i, start, chunk_len, output_offset));
-        }
+/// Получает непрерывный буфер байтов из любого объекта с buffer protocol
+/// (bytes, bytearray, memoryview, mmap, array.array('B'), numpy uint8) без копирования.
+fn get_input_buffer(data: &PyAny) -> PyResult<PyBuffer<u8>> {
+    let buffer = PyBuffer::<u8>::get(data)?;
+    if !buffer.is_c_contiguous() {
+        return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(
+            "Input buffer must be C-contiguous"
+        ));
+    }
+    Ok(buffer)
+}
 
-        // Close sender so workers know when to stop
-        drop(work_sender);
+/// Данные буфера как срез байтов.
+///
+/// Пока буфер экспортирован, объект не может изменить размер или освободить
+/// память (bytearray, mmap запрещают resize/close), поэтому срез валиден всё
+/// время жизни `buffer`, в том числе с отпущенным GIL. Изменение содержимого
+/// из другого Python-потока во время кодирования даёт неопределённый результат.
+fn buffer_as_slice(buffer: &PyBuffer<u8>) -> &[u8] {
+    if buffer.len_bytes() == 0 {
+        return &[];
+    }
+    // SAFETY: буфер C-contiguous (get_input_buffer) из len_bytes() байт, см. выше
+    unsafe { std::slice::from_raw_parts(buffer.buf_ptr() as *const u8, buffer.len_bytes()) }
+}
 
-        // Collect results (порядок получения не важен!)
-        for _ in 0..num_chunks {
-            if let Ok((_chunk_idx, output_offset, encoded_data)) = result_receiver.recv() {
-                // Write directly to pre-allocated buffer
-                output_buffer[output_offset..output_offset + encoded_data.len()]
-                    .copy_from_slice(&encoded_data);
-            }
+/// Размер transparent huge page на Linux (x86_64, aarch64 с 4KB страницами).
+#[cfg(target_os = "linux")]
+const HUGE_PAGE_SIZE: usize = 2 * 1024 * 1024;
+
+/// Просит ядро Linux отображать ещё не заполненный буфер вывода на 2MB
+/// страницах (MADV_HUGEPAGE): вместо ~512 minor page fault на каждые 2MB -
+/// один. Для буферов меньше huge page не вызывается - syscall дороже выгоды.
+/// Края, не выровненные по странице, не затрагиваются. Ошибка madvise (THP
+/// выключены, старое ядро) не мешает кодированию.
+#[cfg(target_os = "linux")]
+fn hint_hugepage(buf: &mut [u8]) {
+    if buf.len() < HUGE_PAGE_SIZE {
+        return;
+    }
+    // SAFETY: sysconf без побочных эффектов
+    let page = unsafe { libc::sysconf(libc::_SC_PAGESIZE) }.max(4096) as usize;
+    let start = (buf.as_ptr() as usize + page - 1) & !(page - 1);
+    let end = (buf.as_ptr() as usize + buf.len()) & !(page - 1);
+    if end > start {
+        // SAFETY: [start, end) целиком лежит внутри `buf`; MADV_HUGEPAGE лишь
+        // подсказка и не меняет содержимое памяти
+        unsafe {
+            libc::madvise(start as *mut libc::c_void, end - start, libc::MADV_HUGEPAGE);
         }
+    }
+}
 
-        // Scoped threads автоматически join'ятся здесь при выходе из scope
-    }).expect("Thread pool failed");
+#[cfg(not(target_os = "linux"))]
+fn hint_hugepage(_buf: &mut [u8]) {}
 
-    // Append tail
-    if !tail_encoded.is_empty() {
-        output_buffer[main_output_len..].copy_from_slice(tail_encoded.as_bytes());
+/// Выделяет незаполненную compact ASCII строку длины `len` и её данные.
+///
+/// SAFETY: срез валиден, пока жив объект строки; до заполнения строку нельзя
+/// отдавать Python-коду.
+#[cfg(not(any(Py_LIMITED_API, PyPy, GraalPy)))]
+unsafe fn alloc_ascii_string<'a>(py: Python, len: usize) -> PyResult<(PyObject, &'a mut [u8])> {
+    // PyUnicode_New(len, 127) возвращает новую compact ASCII строку, данные
+    // которой - непрерывный буфер из len байт (+ завершающий 0)
+    let ptr = ffi::PyUnicode_New(len as ffi::Py_ssize_t, 127);
+    if ptr.is_null() {
+        return Err(PyErr::fetch(py));
+    }
+    let string = PyObject::from_owned_ptr(py, ptr);
+    let out = std::slice::from_raw_parts_mut(ffi::PyUnicode_DATA(ptr) as *mut u8, len);
+    hint_hugepage(out);
+    Ok((string, out))
+}
+
+/// Создаёт Python str длины `len`, буфер которого заполняет `fill` (без GIL).
+///
+/// Вывод Base64 - ASCII по построению, поэтому строка создаётся сразу как
+/// compact ASCII (PyUnicode_New с maxchar 127) и кодировщик пишет прямо в её
+/// данные: без промежуточного String, копирования и проверки UTF-8.
+/// В limited API / PyPy / GraalPy внутренний буфер недоступен - там строка
+/// собирается из временного буфера.
+fn new_ascii_string<F>(py: Python, len: usize, fill: F) -> PyResult<PyObject>
+where
+    F: FnOnce(&mut [u8]) + Send,
+{
+    #[cfg(not(any(Py_LIMITED_API, PyPy, GraalPy)))]
+    {
+        // SAFETY: строка не покидает функцию, пока `out` используется
+        let (string, out) = unsafe { alloc_ascii_string(py, len)? };
+        py.allow_threads(move || fill(out));
+        Ok(string)
     }
 
-    // SAFETY: base64 encoding produces valid UTF-8 (ASCII subset)
-    unsafe { String::from_utf8_unchecked(output_buffer) }
+    #[cfg(any(Py_LIMITED_API, PyPy, GraalPy))]
+    {
+        let mut out = vec![0u8; len];
+        hint_hugepage(&mut out);
+        py.allow_threads(|| fill(&mut out));
+        // SAFETY: base64 encoding produces valid UTF-8 (ASCII subset)
+        let encoded = unsafe { std::str::from_utf8_unchecked(&out) };
+        Ok(PyString::new(py, encoded).into())
+    }
 }
 
-/// Быстрая проверка корректности Base64 строки.
-fn is_valid_base64_length(len: usize) -> bool {
-    len % 4 == 0 || len == 0
+/// Создаёт Python bytes длины `len`, буфер которого заполняет `fill` (без GIL).
+///
+/// В отличие от PyBytes::new_with буфер не обнуляется заранее: обнуление
+/// затронуло бы каждую страницу до того, как hint_hugepage успеет подействовать,
+/// и записывало бы вывод дважды. Ошибка `fill` освобождает объект.
+fn new_bytes<F>(py: Python, len: usize, fill: F) -> PyResult<PyObject>
+where
+    F: FnOnce(&mut [u8]) -> PyResult<()> + Send,
+{
+    #[cfg(not(any(PyPy, GraalPy)))]
+    {
+        // SAFETY: PyBytes_FromStringAndSize(NULL, len) возвращает новый объект
+        // с неинициализированным буфером из len байт (+ завершающий 0).
+        // Объект ещё не виден Python-коду, пока мы его заполняем.
+        let bytes = unsafe {
+            let ptr = ffi::PyBytes_FromStringAndSize(std::ptr::null(), len as ffi::Py_ssize_t);
+            if ptr.is_null() {
+                return Err(PyErr::fetch(py));
+            }
+            PyObject::from_owned_ptr(py, ptr)
+        };
+        let out = unsafe {
+            std::slice::from_raw_parts_mut(ffi::PyBytes_AsString(bytes.as_ptr()) as *mut u8, len)
+        };
+        hint_hugepage(out);
+        py.allow_threads(move || fill(out))?;
+        Ok(bytes)
+    }
+
+    // В PyPy / GraalPy буфер bytes эмулируется - используем безопасный путь
+    #[cfg(any(PyPy, GraalPy))]
+    {
+        let bytes = PyBytes::new_with(py, len, |out| py.allow_threads(|| fill(out)))?;
+        Ok(bytes.into())
+    }
 }
 
 // --- Публичные функции ---
 
 /// Кодирует байты в строку Base64.
 ///
-/// Автоматически использует SIMD и многопоточность для больших данных.
+/// Автоматически выбирает стратегию по размеру данных:
+/// - < 4MB: Single-threaded с SIMD
+/// - 4-20MB: Rayon (лучше для данных в пределах L3 cache)
+/// - > 20MB: Pipeline (лучше для больших данных за пределами cache)
+/// - вход и вывод больше LLC: Pipeline с потоковыми store - вывод не
+///   вытесняет из L3 ещё не прочитанный вход
 /// 
 /// Args:
-///     data: Bytes to encode
+///     data: Bytes-like object to encode (bytes, bytearray, memoryview, mmap, ...)
 /// 
 /// Returns:
 ///     Base64 encoded string
@@ -230,8 +588,9 @@ fn is_valid_base64_length(len: usize) -> bool {
 /// Raises:
 ///     ValueError: If input is too large
 #[pyfunction]
-fn encode(py: Python, data: &PyBytes) -> PyResult<String> {
-    let input_data = data.as_bytes();
+fn encode(py: Python, data: &PyAny) -> PyResult<PyObject> {
+    let input_buffer = get_input_buffer(data)?;
+    let input_data = buffer_as_slice(&input_buffer);
 
     // Проверка размера для защиты от OOM
     if input_data.len() > MAX_INPUT_SIZE {
@@ -241,24 +600,89 @@ fn encode(py: Python, data: &PyBytes) -> PyResult<String> {
         ));
     }
 
-    py.allow_threads(move || {
-        if input_data.len() < MULTITHREAD_THRESHOLD {
-            // Для небольших данных - обычное кодирование с SIMD
-            Ok(general_purpose::STANDARD.encode(input_data))
-        } else {
-            // Для больших данных - многопоточность
-            Ok(encode_multithreaded(input_data, get_optimal_threads()))
+    new_ascii_string(py, encoded_len(input_data.len()), |out| encode_to_slice(input_data, out))
+}
+
+/// Кодирует набор объектов в список строк Base64 за один вызов.
+///
+/// Для небольших входов накладные расходы вызова (разбор аргументов,
+/// освобождение и захват GIL) сравнимы с самим кодированием - здесь они
+/// платятся один раз на весь набор: строки результата создаются заранее,
+/// затем все входы кодируются при одном отпускании GIL (каждый - по той же
+/// стратегии, что и encode()).
+///
+/// Args:
+///     items: Iterable of bytes-like objects (bytes, bytearray, memoryview, mmap, ...)
+///
+/// Returns:
+///     List of Base64 encoded strings, in the order of items
+///
+/// Raises:
+///     ValueError: If any input is too large
+#[pyfunction]
+fn encode_many(py: Python, items: &PyAny) -> PyResult<PyObject> {
+    let buffers = items
+        .iter()?
+        .map(|item| get_input_buffer(item?))
+        .collect::<PyResult<Vec<_>>>()?;
+    let inputs: Vec<&[u8]> = buffers.iter().map(buffer_as_slice).collect();
+
+    // Проверка размера для защиты от OOM
+    if let Some(input) = inputs.iter().find(|input| input.len() > MAX_INPUT_SIZE) {
+        return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(
+            format!("Input too large: {} bytes (max: {} bytes)",
+                   input.len(), MAX_INPUT_SIZE)
+        ));
+    }
+
+    #[cfg(not(any(Py_LIMITED_API, PyPy, GraalPy)))]
+    {
+        let mut strings = Vec::with_capacity(inputs.len());
+        let mut outs = Vec::with_capacity(inputs.len());
+        for input in &inputs {
+            // SAFETY: строки отдаются Python-коду только после заполнения
+            let (string, out) = unsafe { alloc_ascii_string(py, encoded_len(input.len()))? };
+            strings.push(string);
+            outs.push(out);
         }
-    })
+        py.allow_threads(|| {
+            for (input, out) in inputs.iter().zip(outs) {
+                encode_to_slice(input, out);
+            }
+        });
+        Ok(PyList::new(py, strings).into())
+    }
+
+    // Без доступа к данным строки - один общий буфер на весь набор
+    #[cfg(any(Py_LIMITED_API, PyPy, GraalPy))]
+    {
+        let mut out = vec![0u8; inputs.iter().map(|input| encoded_len(input.len())).sum()];
+        py.allow_threads(|| {
+            let mut rest = &mut out[..];
+            for input in &inputs {
+                let (part, tail) = std::mem::take(&mut rest).split_at_mut(encoded_len(input.len()));
+                encode_to_slice(input, part);
+                rest = tail;
+            }
+        });
+        let mut offset = 0;
+        let strings = inputs.iter().map(|input| {
+            let part = &out[offset..offset + encoded_len(input.len())];
+            offset += part.len();
+            // SAFETY: base64 encoding produces valid UTF-8 (ASCII subset)
+            PyString::new(py, unsafe { std::str::from_utf8_unchecked(part) })
+        });
+        Ok(PyList::new(py, strings).into())
+    }
 }
 
 /// Кодирует байты в Base64 и возвращает bytes (максимальная производительность).
 ///
-/// Аналогичен encode(), но возвращает bytes вместо string для максимальной
-/// производительности. Используйте когда результат не нужно конвертировать в string.
+/// Аналогичен encode() (та же стратегия), но возвращает bytes вместо string.
+/// Результат пишется сразу в буфер нового объекта bytes, без промежуточной строки.
 ///
 /// Args:
-///     data: Bytes to encode
+///     data: Bytes-like object to encode (bytes, bytearray, memoryview, mmap, ...)
 ///
 /// Returns:
 ///     Base64 encoded bytes (ASCII)
@@ -266,8 +690,9 @@ fn encode(py: Python, data: &PyBytes) -> PyResult<String> {
 /// Raises:
 ///     ValueError: If input is too large
 #[pyfunction]
-fn encode_bytes(py: Python, data: &PyBytes) -> PyResult<PyObject> {
-    let input_data = data.as_bytes();
+fn encode_bytes(py: Python, data: &PyAny) -> PyResult<PyObject> {
+    let input_buffer = get_input_buffer(data)?;
+    let input_data = buffer_as_slice(&input_buffer);
 
     // Проверка размера для защиты от OOM
     if input_data.len() > MAX_INPUT_SIZE {
@@ -277,28 +702,95 @@ fn encode_bytes(py: Python, data: &PyBytes) -> PyResult<PyObject> {
         ));
     }
 
-    py.allow_threads(move || {
-        let encoded_string = if input_data.len() < MULTITHREAD_THRESHOLD {
-            // Для небольших данных - обычное кодирование с SIMD
-            general_purpose::STANDARD.encode(input_data)
-        } else {
-            // Для больших данных - многопоточность
-            encode_multithreaded(input_data, get_optimal_threads())
-        };
-
-        // Конвертируем String в bytes для максимальной производительности
-        Ok(Python::with_gil(|py| PyBytes::new(py, encoded_string.as_bytes()).into()))
+    new_bytes(py, encoded_len(input_data.len()), |out| {
+        encode_to_slice(input_data, out);
+        Ok(())
     })
 }
 
+/// Кодирует байты в Base64 напрямую в предоставленный буфер (zero-copy).
+///
+/// Использует ту же стратегию, что и encode(), но пишет результат в
+/// заранее выделенный буфер вместо создания новой строки на каждый вызов.
+/// Позволяет переиспользовать выходной буфер между вызовами.
+///
+/// Args:
+///     data: Bytes-like object to encode (bytes, bytearray, memoryview, mmap, ...)
+///     out: Writable C-contiguous buffer (bytearray, memoryview, mmap, NumPy uint8, ...)
+///          of at least (len(data) + 2) // 3 * 4 bytes
+///
+/// Returns:
+///     Number of bytes written to out
+///
+/// Raises:
+///     TypeError: If out is read-only
+///     ValueError: If input is too large, out is too small, not contiguous
+///                 or overlaps data
+#[pyfunction]
+fn encode_into(py: Python, data: &PyAny, out: &PyAny) -> PyResult<usize> {
+    let input_buffer = get_input_buffer(data)?;
+    let input_data = buffer_as_slice(&input_buffer);
+
+    // Проверка размера для защиты от OOM
+    if input_data.len() > MAX_INPUT_SIZE {
+        return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(
+            format!("Input too large: {} bytes (max: {} bytes)",
+                   input_data.len(), MAX_INPUT_SIZE)
+        ));
+    }
+
+    // Экспорт буфера запрещает изменять размер объекта, пока GIL отпущен
+    let out_buffer = PyBuffer::<u8>::get(out)?;
+    if !out_buffer.is_c_contiguous() {
+        return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(
+            "Output buffer must be C-contiguous"
+        ));
+    }
+    if out_buffer.readonly() {
+        return Err(PyErr::new::<pyo3::exceptions::PyTypeError, _>(
+            "Output buffer must be writable"
+        ));
+    }
+
+    let out_len = encoded_len(input_data.len());
+    if out_buffer.len_bytes() < out_len {
+        return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(
+            format!("Output buffer too small: {} bytes (need: {} bytes)",
+                   out_buffer.len_bytes(), out_len)
+        ));
+    }
+
+    // Запись поверх читаемого входа (тот же bytearray, memoryview на него)
+    // испортила бы ещё не прочитанные данные
+    let out_start = out_buffer.buf_ptr() as usize;
+    let in_start = input_data.as_ptr() as usize;
+    if out_len > 0 && !input_data.is_empty()
+        && out_start < in_start + input_data.len() && in_start < out_start + out_len {
+        return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(
+            "Output buffer overlaps input data"
+        ));
+    }
+
+    // SAFETY: буфер непрерывен, доступен для записи, не пересекается со входом
+    // и не меньше out_len; пока out_buffer жив, объект не может быть
+    // перераспределен.
+    let out_slice = unsafe {
+        std::slice::from_raw_parts_mut(out_buffer.buf_ptr() as *mut u8, out_len)
+    };
+
+    py.allow_threads(move || encode_to_slice(input_data, out_slice));
+
+    Ok(out_len)
+}
+
 /// Кодирует байты в Base64 используя конвейерную архитектуру (экспериментально).
 ///
-/// Использует явное управление потоками через crossbeam channels вместо Rayon.
-/// Потенциально более эффективен для больших данных за счёт лучшего управления
-/// кешем и параллелизмом.
+/// Использует постоянный пул потоков (по одному на физическое ядро) с
+/// mpsc-каналами вместо Rayon. Потенциально более эффективен для больших данных
+/// за счёт лучшего управления кешем и параллелизмом.
 ///
 /// Args:
-///     data: Bytes to encode
+///     data: Bytes-like object to encode (bytes, bytearray, memoryview, mmap, ...)
 ///
 /// Returns:
 ///     Base64 encoded string
@@ -306,8 +798,9 @@ fn encode_bytes(py: Python, data: &PyBytes) -> PyResult<PyObject> {
 /// Raises:
 ///     ValueError: If input is too large
 #[pyfunction]
-fn encode_pipeline_py(py: Python, data: &PyBytes) -> PyResult<String> {
-    let input_data = data.as_bytes();
+fn encode_pipeline_py(py: Python, data: &PyAny) -> PyResult<PyObject> {
+    let input_buffer = get_input_buffer(data)?;
+    let input_data = buffer_as_slice(&input_buffer);
 
     // Проверка размера для защиты от OOM
     if input_data.len() > MAX_INPUT_SIZE {
@@ -317,20 +810,15 @@ fn encode_pipeline_py(py: Python, data: &PyBytes) -> PyResult<String> {
         ));
     }
 
-    py.allow_threads(move || {
-        Ok(encode_pipeline(input_data))
-    })
+    new_ascii_string(py, encoded_len(input_data.len()), |out| encode_pipeline_into(input_data, out, false))
 }
 
 /// Кодирует байты в Base64 используя автоматический выбор алгоритма.
 ///
-/// Автоматически выбирает оптимальную стратегию на основе размера данных:
-/// - < 1MB: Single-threaded с SIMD
-/// - 1-20MB: Rayon (лучше для данных в пределах L3 cache)
-/// - > 20MB: Pipeline (лучше для больших данных за пределами cache)
+/// Сохранён для совместимости: encode() использует ту же стратегию.
 ///
 /// Args:
-///     data: Bytes to encode
+///     data: Bytes-like object to encode (bytes, bytearray, memoryview, mmap, ...)
 ///
 /// Returns:
 ///     Base64 encoded string
@@ -338,8 +826,9 @@ fn encode_pipeline_py(py: Python, data: &PyBytes) -> PyResult<String> {
 /// Raises:
 ///     ValueError: If input is too large
 #[pyfunction]
-fn encode_auto(py: Python, data: &PyBytes) -> PyResult<String> {
-    let input_data = data.as_bytes();
+fn encode_auto(py: Python, data: &PyAny) -> PyResult<PyObject> {
+    let input_buffer = get_input_buffer(data)?;
+    let input_data = buffer_as_slice(&input_buffer);
 
     // Проверка размера для защиты от OOM
     if input_data.len() > MAX_INPUT_SIZE {
@@ -349,26 +838,13 @@ fn encode_auto(py: Python, data: &PyBytes) -> PyResult<String> {
         ));
     }
 
-    py.allow_threads(move || {
-        let len = input_data.len();
-
-        if len < MULTITHREAD_THRESHOLD {
-            // Для маленьких данных - single-threaded
-            Ok(general_purpose::STANDARD.encode(input_data))
-        } else if len < 20 * 1024 * 1024 {
-            // Для средних данных (1-20MB) - Rayon (оптимален для L3 cache)
-            Ok(encode_multithreaded(input_data, get_optimal_threads()))
-        } else {
-            // Для больших данных (>20MB) - Pipeline (стабильнее вне cache)
-            Ok(encode_pipeline(input_data))
-        }
-    })
+    new_ascii_string(py, encoded_len(input_data.len()), |out| encode_to_slice(input_data, out))
 }
 
 /// Декодирует строку Base64 в байты.
 ///
 /// Args:
-///     data: Base64 string to decode
+///     data: Base64 string or bytes-like object to decode
 ///
 /// Returns:
 ///     Decoded bytes
@@ -376,45 +852,53 @@ fn encode_auto(py: Python, data: &PyBytes) -> PyResult<String> {
 /// Raises:
 ///     ValueError: If input is invalid Base64
 #[pyfunction]
-fn decode(py: Python, data: &str) -> PyResult<PyObject> {
+fn decode(py: Python, data: &PyAny) -> PyResult<PyObject> {
+    // str читается без копирования (у ASCII-строки UTF-8 - сами данные объекта),
+    // остальное - через buffer protocol
+    let input_buffer;
+    let input_data = if let Ok(string) = data.downcast::<PyString>() {
+        string.to_str()?.as_bytes()
+    } else {
+        input_buffer = get_input_buffer(data)?;
+        buffer_as_slice(&input_buffer)
+    };
+
     // Быстрые проверки
-    if data.len() > MAX_INPUT_SIZE {
+    if input_data.len() > MAX_INPUT_SIZE {
         return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(
             "Input too large"
         ));
     }
     
-    if !is_valid_base64_length(data.len()) {
+    if !is_valid_base64_length(input_data.len()) {
         return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(
             "Invalid Base64 length"
         ));
     }
 
-    // Скопируем строку для использования в allow_threads
-    let data_owned = data.to_owned();
-
-    py.allow_threads(move || {
-        let decoded_bytes = general_purpose::STANDARD.decode(data_owned)
+    // Декодируем сразу в буфер нового объекта bytes при отпущенном GIL
+    new_bytes(py, simd::decoded_len(input_data), |out| {
+        simd::decode_slice(input_data, out)
+            .map(|_| ())
             .map_err(|e| PyErr::new::<pyo3::exceptions::PyValueError, _>(
                 format!("Invalid Base64: {}", e)
-            ))?;
-        
-        // Создаем PyBytes в основном потоке
-        Ok(Python::with_gil(|py| PyBytes::new(py, &decoded_bytes).into()))
+            ))
     })
 }
 
 /// Кодирует байты в строку Base64 с явным указанием количества потоков.
 ///
 /// Args:
-///     data: Bytes to encode
-///     threads: Number of threads to use (1-16)
+///     data: Bytes-like object to encode (bytes, bytearray, memoryview, mmap, ...)
+///     threads: Number of threads to use (1-16); the input is split into
+///         that many equal parts, run on the shared Rayon pool
 /// 
 /// Returns:
 ///     Base64 encoded string
 #[pyfunction]
-fn encode_with_threads(py: Python, data: &PyBytes, threads: usize) -> PyResult<String> {
-    let input_data = data.as_bytes();
+fn encode_with_threads(py: Python, data: &PyAny, threads: usize) -> PyResult<PyObject> {
+    let input_buffer = get_input_buffer(data)?;
+    let input_data = buffer_as_slice(&input_buffer);
     
     if input_data.len() > MAX_INPUT_SIZE {
         return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(
@@ -424,25 +908,167 @@ fn encode_with_threads(py: Python, data: &PyBytes, threads: usize) -> PyResult<S
     
     let num_threads = threads.clamp(1, MAX_THREADS * 2);
 
-    py.allow_threads(move || {
+    new_ascii_string(py, encoded_len(input_data.len()), |out| {
         if num_threads == 1 || input_data.len() < MIN_CHUNK_SIZE {
-            Ok(general_purpose::STANDARD.encode(input_data))
+            simd::encode_slice(input_data, out);
         } else {
-            Ok(encode_multithreaded(input_data, num_threads))
+            encode_split_into(input_data, out, num_threads);
         }
     })
 }
 
+/// Однопоточное SIMD-кодирование с заданным вариантом prefetch (общая часть
+/// отладочных функций encode_no_prefetch / encode_prefetch_t0 / encode_prefetch_nta).
+fn encode_with_prefetch(
+    py: Python,
+    data: &PyAny,
+    prefetch: simd::Prefetch,
+    distance: usize,
+    stream: bool,
+) -> PyResult<PyObject> {
+    let input_buffer = get_input_buffer(data)?;
+    let input_data = buffer_as_slice(&input_buffer);
+
+    if input_data.len() > MAX_INPUT_SIZE {
+        return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(
+            format!("Input too large: {} bytes (max: {} bytes)",
+                   input_data.len(), MAX_INPUT_SIZE)
+        ));
+    }
+
+    new_ascii_string(py, encoded_len(input_data.len()), |out| {
+        simd::encode_slice_with_prefetch(input_data, out, prefetch, distance, stream)
+    })
+}
+
+/// Кодирует байты в Base64 одним потоком без программного prefetch (отладка).
+///
+/// Базовая линия для encode_prefetch_t0() / encode_prefetch_nta():
+/// полагается только на аппаратный prefetcher.
+///
+/// Args:
+///     data: Bytes-like object to encode (bytes, bytearray, memoryview, mmap, ...)
+///
+/// Returns:
+///     Base64 encoded string
+#[pyfunction]
+fn encode_no_prefetch(py: Python, data: &PyAny) -> PyResult<PyObject> {
+    encode_with_prefetch(py, data, simd::Prefetch::None, 0, false)
+}
+
+/// Кодирует байты в Base64 одним потоком с PREFETCHT0 (отладка).
+///
+/// Внутренний цикл SIMD-кодировщика запрашивает линию `distance` байт
+/// впереди текущей позиции в каждой 64-байтной итерации.
+///
+/// Args:
+///     data: Bytes-like object to encode (bytes, bytearray, memoryview, mmap, ...)
+///     distance: Prefetch distance in bytes (default: 512)
+///
+/// Returns:
+///     Base64 encoded string
+#[pyfunction]
+#[pyo3(signature = (data, distance = simd::DEFAULT_PREFETCH_DISTANCE))]
+fn encode_prefetch_t0(py: Python, data: &PyAny, distance: usize) -> PyResult<PyObject> {
+    encode_with_prefetch(py, data, simd::Prefetch::T0, distance, false)
+}
+
+/// Кодирует байты в Base64 одним потоком с PREFETCHNTA (отладка).
+///
+/// Как encode_prefetch_t0(), но с non-temporal подсказкой: линии загружаются
+/// с минимальным вытеснением данных из L2/L3. С `stream=True` вывод пишется
+/// потоковыми store, как в encode() для данных больше LLC, - классическая пара
+/// "NTA для входа, non-temporal store для вывода".
+///
+/// Args:
+///     data: Bytes-like object to encode (bytes, bytearray, memoryview, mmap, ...)
+///     distance: Prefetch distance in bytes (default: 512)
+///     stream: Write the output with non-temporal stores (default: False)
+///
+/// Returns:
+///     Base64 encoded string
+#[pyfunction]
+#[pyo3(signature = (data, distance = simd::DEFAULT_PREFETCH_DISTANCE, stream = false))]
+fn encode_prefetch_nta(py: Python, data: &PyAny, distance: usize, stream: bool) -> PyResult<PyObject> {
+    encode_with_prefetch(py, data, simd::Prefetch::Nta, distance, stream)
+}
+
+/// Бенчмарк encode() для набора размеров за один вызов (без Python-цикла).
+///
+/// GIL отпускается один раз на весь прогон. Для каждого размера кодируется
+/// префикс data[:size] в переиспользуемый буфер: один прогрев, затем
+/// `iterations` замеров. Исключает из замера накладные расходы на вызов
+/// из Python, разбор аргументов и создание результата.
+///
+/// Args:
+///     data: Bytes-like object to take prefixes from
+///     sizes: Prefix sizes in bytes (each <= len(data))
+///     iterations: Number of timed runs per size
+///
+/// Returns:
+///     List of (median_ns, mad_ns) tuples, one per size
+///
+/// Raises:
+///     ValueError: If a size is larger than data or MAX_INPUT_SIZE, or iterations is 0
+#[pyfunction]
+fn bench_sweep(py: Python, data: &PyAny, sizes: Vec<usize>, iterations: usize) -> PyResult<Vec<(f64, f64)>> {
+    let input_buffer = get_input_buffer(data)?;
+    let input_data = buffer_as_slice(&input_buffer);
+
+    if iterations == 0 {
+        return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(
+            "iterations must be at least 1"
+        ));
+    }
+
+    let max_size = sizes.iter().copied().max().unwrap_or(0);
+    if max_size > input_data.len().min(MAX_INPUT_SIZE) {
+        return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(
+            format!("Size too large: {} bytes (data: {} bytes, max: {} bytes)",
+                   max_size, input_data.len(), MAX_INPUT_SIZE)
+        ));
+    }
+
+    py.allow_threads(move || {
+        let mut output = vec![0u8; encoded_len(max_size)];
+        let mut times = Vec::with_capacity(iterations);
+
+        let results: Vec<(f64, f64)> = sizes.iter().map(|&size| {
+            let input = &input_data[..size];
+            let out = &mut output[..encoded_len(size)];
+
+            // Прогрев
+            encode_to_slice(input, out);
+
+            times.clear();
+            for _ in 0..iterations {
+                let start = Instant::now();
+                encode_to_slice(input, std::hint::black_box(&mut *out));
+                times.push(start.elapsed().as_nanos() as f64);
+            }
+            median_mad(&mut times)
+        }).collect();
+
+        Ok(results)
+    })
+}
+
 /// Получает информацию о конфигурации библиотеки.
 #[pyfunction]
 fn get_info() -> PyResult<std::collections::HashMap<String, String>> {
     let mut info = std::collections::HashMap::new();
     info.insert("version".to_string(), env!("CARGO_PKG_VERSION").to_string());
     info.insert("multithread_threshold".to_string(), MULTITHREAD_THRESHOLD.to_string());
+    info.insert("pipeline_threshold".to_string(), PIPELINE_THRESHOLD.to_string());
+    info.insert("min_chunk_size".to_string(), MIN_CHUNK_SIZE.to_string());
     info.insert("max_threads".to_string(), MAX_THREADS.to_string());
     info.insert("max_input_size".to_string(), MAX_INPUT_SIZE.to_string());
-    info.insert("available_cpus".to_string(), num_cpus::get().to_string());
-    info.insert("rayon_threads".to_string(), rayon::current_num_threads().to_string());
+    info.insert("available_cpus".to_string(), get_available_cpus().to_string());
+    info.insert("selected_impl".to_string(), simd::selected_kernel().name().to_string());
+    info.insert("l2_cache_size".to_string(), simd::cache_sizes().l2.to_string());
+    info.insert("llc_size".to_string(), simd::cache_sizes().llc.to_string());
+    info.insert("rayon_threads".to_string(), get_rayon_pool().current_num_threads().to_string());
+    info.insert("pipeline_workers".to_string(), get_pipeline_workers().to_string());
     Ok(info)
 }
 
@@ -610,18 +1236,31 @@ fn decode_file_streaming(py: Python, input_path: &str, output_path: &str) -> PyR
 /// Python модуль ultrabase64.
 #[pymodule]
 fn ultrabase64(_py: Python, m: &PyModule) -> PyResult<()> {
+    // Пул Rayon создаётся при импорте, а не на первом многопоточном вызове:
+    // иначе запуск потоков (сотни микросекунд) попадает в первый замер.
+    // Пул конвейера остаётся ленивым. В дочернем процессе после fork() оба
+    // пула создаются заново при первом обращении (см. ForkSafePool).
+    get_rayon_pool();
+
     m.add_function(wrap_pyfunction!(encode, m)?)?;
     m.add_function(wrap_pyfunction!(encode_bytes, m)?)?;
+    m.add_function(wrap_pyfunction!(encode_into, m)?)?;
+    m.add_function(wrap_pyfunction!(encode_many, m)?)?;
     m.add_function(wrap_pyfunction!(encode_pipeline_py, m)?)?;
     m.add_function(wrap_pyfunction!(encode_auto, m)?)?;
     m.add_function(wrap_pyfunction!(decode, m)?)?;
     m.add_function(wrap_pyfunction!(encode_with_threads, m)?)?;
     m.add_function(wrap_pyfunction!(encode_file_streaming, m)?)?;
     m.add_function(wrap_pyfunction!(decode_file_streaming, m)?)?;
+    m.add_function(wrap_pyfunction!(encode_no_prefetch, m)?)?;
+    m.add_function(wrap_pyfunction!(encode_prefetch_t0, m)?)?;
+    m.add_function(wrap_pyfunction!(encode_prefetch_nta, m)?)?;
+    m.add_function(wrap_pyfunction!(bench_sweep, m)?)?;
     m.add_function(wrap_pyfunction!(get_info, m)?)?;
 
     // Константы, доступные из Python
     m.add("MULTITHREAD_THRESHOLD", MULTITHREAD_THRESHOLD)?;
+    m.add("PIPELINE_THRESHOLD", PIPELINE_THRESHOLD)?;
     m.add("MAX_INPUT_SIZE", MAX_INPUT_SIZE)?;
     m.add("MIN_CHUNK_SIZE", MIN_CHUNK_SIZE)?;
     m.add("MAX_THREADS", MAX_THREADS)?;
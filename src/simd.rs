@@ -0,0 +1,825 @@
+// src/simd.rs - однопоточное SIMD-ядро кодирования Base64
+//
+// Зависит только от base64 (хвост и scalar fallback), без PyO3.
+
+use base64::{DecodeError, Engine as _, engine::general_purpose};
+use std::sync::OnceLock;
+
+#[cfg(target_arch = "x86_64")]
+use std::arch::x86_64::*;
+#[cfg(target_arch = "aarch64")]
+use std::arch::aarch64::*;
+
+/// Дистанция программного prefetch по умолчанию (байт вперёд от текущей позиции).
+pub const DEFAULT_PREFETCH_DISTANCE: usize = 512;
+
+/// Вариант программного prefetch во внутреннем цикле.
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
+pub enum Prefetch {
+    /// Без prefetch - полагаемся на аппаратный prefetcher.
+    None,
+    /// PREFETCHT0 - загрузка во все уровни кэша.
+    T0,
+    /// PREFETCHNTA - загрузка с минимальным загрязнением кэша.
+    Nta,
+}
+
+/// Кодирует `input` в `out` (с padding).
+/// Длина `out` должна быть равна `(input.len() + 2) / 3 * 4`.
+pub fn encode_slice(input: &[u8], out: &mut [u8]) {
+    encode_slice_with_prefetch(input, out, Prefetch::None, 0, false);
+}
+
+/// Как `encode_slice`, но символы пишутся потоковыми (non-temporal) store в
+/// обход кэша: вывод не вытесняет из L3 ещё не прочитанный вход. Для данных
+/// больше последнего уровня кэша, чей результат не читается сразу же.
+/// На CPU без AVX2 работает как `encode_slice`.
+///
+/// Программного prefetch здесь нет: PREFETCHNTA на 128 байт вперёд вместе с
+/// потоковыми store замедлил кодирование 96MB с 8.2 до 6.4 GB/s (AVX-512 VBMI)
+/// и с 6.2 до 4.8 GB/s (AVX2) - аппаратный prefetcher уже успевает за чтением.
+/// Сочетание можно замерить через `encode_slice_with_prefetch(.., true)`.
+pub fn encode_slice_streaming(input: &[u8], out: &mut [u8]) {
+    encode_with_kernel(selected_kernel(), input, out, Prefetch::None, 0, true);
+}
+
+/// Длина результата decode для корректного входа длины, кратной 4
+/// (по числу символов '=' в конце).
+pub fn decoded_len(input: &[u8]) -> usize {
+    let padding = input.iter().rev().take(2).take_while(|&&c| c == b'=').count();
+    (input.len() / 4 * 3).saturating_sub(padding)
+}
+
+/// Декодирует Base64 (алфавит STANDARD, с padding) в `out`, возвращает
+/// число записанных байт. Длина `out` должна быть равна `decoded_len(input)`.
+/// Результат и ошибки - как у `general_purpose::STANDARD.decode`.
+pub fn decode_slice(input: &[u8], out: &mut [u8]) -> Result<usize, DecodeError> {
+    assert_eq!(out.len(), decoded_len(input), "output buffer is sized by decoded_len");
+
+    if input.len().is_multiple_of(4) {
+        // Последняя четвёрка (единственная, где допустим padding) разбирается
+        // отдельно: тело декодируется ровно в свой участок `out`
+        let (body, last) = input.split_at(input.len().saturating_sub(4));
+        let (body_out, last_out) = out.split_at_mut(body.len() / 4 * 3);
+
+        let (read, written) = decode_with_kernel(selected_kernel(), body, body_out);
+
+        // Остаток тела (недопустимые символы) - scalar-путём с той же границы четвёрок.
+        // Меньше байт, чем места, - в теле встретился padding, это ошибка.
+        let body_ok = general_purpose::STANDARD
+            .decode_slice_unchecked(&body[read..], &mut body_out[written..])
+            .is_ok_and(|n| written + n == body_out.len());
+
+        let mut quad = [0u8; 3];
+        if body_ok {
+            if let Ok(n) = general_purpose::STANDARD.decode_slice_unchecked(last, &mut quad) {
+                if n == last_out.len() {
+                    last_out.copy_from_slice(&quad[..n]);
+                    return Ok(body_out.len() + n);
+                }
+            }
+        }
+    }
+
+    // Ошибку (и смещение в ней - от начала входа) описывает полный разбор
+    match general_purpose::STANDARD.decode(input) {
+        Err(e) => Err(e),
+        Ok(_) => unreachable!("base64 engine accepted input rejected by decode_slice"),
+    }
+}
+
+/// SIMD-часть decode: (прочитано, записано), прочитанное кратно 4.
+fn decode_with_kernel(kernel: Kernel, input: &[u8], out: &mut [u8]) -> (usize, usize) {
+    #[cfg(target_arch = "x86_64")]
+    {
+        // SAFETY: kernel выбран по is_x86_feature_detected!, AVX-512 включает AVX2
+        match kernel {
+            Kernel::Avx512Vbmi => unsafe {
+                // Остаток короче 64 символов - блоками по 32
+                let (read, written) = decode_avx512vbmi(input, out);
+                let (tail_read, tail_written) = decode_avx2(&input[read..], &mut out[written..]);
+                return (read + tail_read, written + tail_written);
+            },
+            Kernel::Avx512Bw | Kernel::Avx2 => return unsafe { decode_avx2(input, out) },
+            _ => {}
+        }
+    }
+    let _ = (kernel, input, out);
+    (0, 0)
+}
+
+/// Реализация кодировщика, выбираемая один раз по возможностям CPU.
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
+pub enum Kernel {
+    /// AVX-512 VBMI: 48 входных байт -> 64 символа (vpermb + vpmultishiftqb).
+    Avx512Vbmi,
+    /// AVX-512BW без VBMI (Skylake-X, Cascade Lake): алгоритм AVX2 на 512 битах.
+    Avx512Bw,
+    /// AVX2: 24 входных байта -> 32 символа.
+    Avx2,
+    /// NEON (aarch64): 48 входных байт -> 64 символа (vld3q/vst4q).
+    Neon,
+    /// base64::engine::GeneralPurpose.
+    Scalar,
+}
+
+impl Kernel {
+    /// Имя реализации для get_info()["selected_impl"].
+    pub fn name(self) -> &'static str {
+        match self {
+            Kernel::Avx512Vbmi => "avx512vbmi",
+            Kernel::Avx512Bw => "avx512bw",
+            Kernel::Avx2 => "avx2",
+            Kernel::Neon => "neon",
+            Kernel::Scalar => "scalar",
+        }
+    }
+}
+
+/// Выбранная реализация (определяется при первом кодировании).
+static KERNEL: OnceLock<Kernel> = OnceLock::new();
+
+/// Получает реализацию, выбранную для текущего CPU (кешированную).
+pub fn selected_kernel() -> Kernel {
+    *KERNEL.get_or_init(detect_kernel)
+}
+
+fn detect_kernel() -> Kernel {
+    #[cfg(target_arch = "x86_64")]
+    {
+        if is_x86_feature_detected!("avx512f") && is_x86_feature_detected!("avx512bw") {
+            if is_x86_feature_detected!("avx512vbmi") {
+                return Kernel::Avx512Vbmi;
+            }
+            return Kernel::Avx512Bw;
+        }
+        if is_x86_feature_detected!("avx2") {
+            return Kernel::Avx2;
+        }
+    }
+    // NEON есть на всех aarch64 CPU с Linux/macOS/Windows (Apple Silicon,
+    // Graviton), но не входит в target_feature таргетов вроде
+    // aarch64-unknown-none-softfloat - проверяем во время выполнения
+    #[cfg(target_arch = "aarch64")]
+    {
+        if std::arch::is_aarch64_feature_detected!("neon") {
+            return Kernel::Neon;
+        }
+    }
+    Kernel::Scalar
+}
+
+/// Размеры кэшей данных в байтах.
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
+pub struct CacheSizes {
+    /// L2 (на ядро).
+    pub l2: usize,
+    /// Последний уровень: L3, а если его нет - L2.
+    pub llc: usize,
+}
+
+/// Размеры, если CPUID их не сообщает (i7-7700: L2 256 KB, L3 8 MB).
+const DEFAULT_CACHE_SIZES: CacheSizes = CacheSizes { l2: 256 * 1024, llc: 8 * 1024 * 1024 };
+
+/// Размеры кэшей (определяются при первом обращении).
+static CACHE_SIZES: OnceLock<CacheSizes> = OnceLock::new();
+
+/// Получает размеры кэшей текущего CPU (кешированные).
+pub fn cache_sizes() -> CacheSizes {
+    *CACHE_SIZES.get_or_init(detect_cache_sizes)
+}
+
+fn detect_cache_sizes() -> CacheSizes {
+    #[cfg(target_arch = "x86_64")]
+    {
+        // SAFETY: инструкция CPUID есть на любом x86_64
+        #[allow(unused_unsafe)]
+        let (max_basic, max_extended) = unsafe { (__cpuid(0).eax, __cpuid(0x8000_0000).eax) };
+
+        // Intel - лист 4, AMD - лист 0x8000001D, формат у них одинаковый
+        for (leaf, max_leaf) in [(4, max_basic), (0x8000_001d, max_extended)] {
+            if leaf <= max_leaf {
+                if let Some(sizes) = cpuid_cache_sizes(leaf) {
+                    return sizes;
+                }
+            }
+        }
+    }
+    DEFAULT_CACHE_SIZES
+}
+
+/// Перебирает описания кэшей в листе CPUID `leaf` (deterministic cache parameters).
+#[cfg(target_arch = "x86_64")]
+fn cpuid_cache_sizes(leaf: u32) -> Option<CacheSizes> {
+    let mut l2 = 0;
+    let mut l3 = 0;
+
+    for subleaf in 0..16 {
+        // SAFETY: лист не больше максимального, сообщённого CPUID
+        #[allow(unused_unsafe)]
+        let r = unsafe { __cpuid_count(leaf, subleaf) };
+
+        // Тип: 0 - описаний больше нет, 1 - данные, 2 - инструкции, 3 - общий
+        let cache_type = r.eax & 0x1f;
+        if cache_type == 0 {
+            break;
+        }
+        if cache_type == 2 {
+            continue;
+        }
+
+        let ways = ((r.ebx >> 22) & 0x3ff) as usize + 1;
+        let partitions = ((r.ebx >> 12) & 0x3ff) as usize + 1;
+        let line_size = (r.ebx & 0xfff) as usize + 1;
+        let sets = r.ecx as usize + 1;
+        match (r.eax >> 5) & 0x7 {
+            2 => l2 = ways * partitions * line_size * sets,
+            3 => l3 = ways * partitions * line_size * sets,
+            _ => {}
+        }
+    }
+
+    if l2 == 0 {
+        return None;
+    }
+    Some(CacheSizes { l2, llc: if l3 > 0 { l3 } else { l2 } })
+}
+
+/// Как `encode_slice`, но с программным prefetch `distance` байт вперёд и,
+/// при `stream`, потоковыми store (как `encode_slice_streaming`).
+/// Используется в бенчмарках для проверки эффективности аппаратного prefetcher.
+pub fn encode_slice_with_prefetch(
+    input: &[u8],
+    out: &mut [u8],
+    prefetch: Prefetch,
+    distance: usize,
+    stream: bool,
+) {
+    encode_with_kernel(selected_kernel(), input, out, prefetch, distance, stream);
+}
+
+/// `stream` - потоковые store вывода; PREFETCHT0 с ними не сочетается
+/// (линия, загруженная во все уровни, вытесняет то же, что и обычный store).
+fn encode_with_kernel(
+    kernel: Kernel,
+    input: &[u8],
+    out: &mut [u8],
+    prefetch: Prefetch,
+    distance: usize,
+    stream: bool,
+) {
+    assert_eq!(out.len(), input.len().div_ceil(3) * 4, "output buffer is sized by encoded_len");
+
+    let mut read = 0;
+    let mut written = 0;
+
+    #[cfg(target_arch = "x86_64")]
+    {
+        let simd = matches!(kernel, Kernel::Avx512Vbmi | Kernel::Avx512Bw | Kernel::Avx2);
+
+        // Потоковым store нужен адрес, кратный 32 (AVX2) или 64 (AVX-512):
+        // голову до границы 64 байт кодируем scalar-путём. Символы пишутся
+        // группами по 4, поэтому выровнять можно лишь адрес, кратный 4.
+        let misalign = out.as_ptr() as usize % 64;
+        let stream = stream && simd && misalign.is_multiple_of(4);
+        if stream && misalign != 0 {
+            read = ((64 - misalign) / 4 * 3).min(input.len() / 3 * 3);
+            written = read / 3 * 4;
+            encode_tail(&input[..read], &mut out[..written]);
+        }
+
+        // SAFETY: kernel выбран по is_x86_feature_detected!, длина out проверена assert'ом
+        unsafe {
+            if kernel == Kernel::Avx512Vbmi {
+                let (src, dst) = (&input[read..], &mut out[written..]);
+                let (r, w) = match (prefetch, stream) {
+                    (Prefetch::None, false) => encode_avx512vbmi::<false, _MM_HINT_T0, false>(src, dst, distance),
+                    (Prefetch::None, true) => encode_avx512vbmi::<false, _MM_HINT_T0, true>(src, dst, distance),
+                    (Prefetch::T0, _) => encode_avx512vbmi::<true, _MM_HINT_T0, false>(src, dst, distance),
+                    (Prefetch::Nta, false) => encode_avx512vbmi::<true, _MM_HINT_NTA, false>(src, dst, distance),
+                    (Prefetch::Nta, true) => encode_avx512vbmi::<true, _MM_HINT_NTA, true>(src, dst, distance),
+                };
+                read += r;
+                written += w;
+            }
+            if kernel == Kernel::Avx512Bw {
+                let (src, dst) = (&input[read..], &mut out[written..]);
+                let (r, w) = match (prefetch, stream) {
+                    (Prefetch::None, false) => encode_avx512bw::<false, _MM_HINT_T0, false>(src, dst, distance),
+                    (Prefetch::None, true) => encode_avx512bw::<false, _MM_HINT_T0, true>(src, dst, distance),
+                    (Prefetch::T0, _) => encode_avx512bw::<true, _MM_HINT_T0, false>(src, dst, distance),
+                    (Prefetch::Nta, false) => encode_avx512bw::<true, _MM_HINT_NTA, false>(src, dst, distance),
+                    (Prefetch::Nta, true) => encode_avx512bw::<true, _MM_HINT_NTA, true>(src, dst, distance),
+                };
+                read += r;
+                written += w;
+            }
+            // AVX-512 kernel-ы кодируют вход до конца сами (маскированный
+            // хвост с padding), scalar-эпилог и AVX2 нужны только на AVX2
+            if kernel == Kernel::Avx2 {
+                let (src, dst) = (&input[read..], &mut out[written..]);
+                let (r, w) = match (prefetch, stream) {
+                    (Prefetch::None, false) => encode_avx2::<false, _MM_HINT_T0, false>(src, dst, distance),
+                    (Prefetch::None, true) => encode_avx2::<false, _MM_HINT_T0, true>(src, dst, distance),
+                    (Prefetch::T0, _) => encode_avx2::<true, _MM_HINT_T0, false>(src, dst, distance),
+                    (Prefetch::Nta, false) => encode_avx2::<true, _MM_HINT_NTA, false>(src, dst, distance),
+                    (Prefetch::Nta, true) => encode_avx2::<true, _MM_HINT_NTA, true>(src, dst, distance),
+                };
+                read += r;
+                written += w;
+            }
+            if stream {
+                // Потоковые store слабо упорядочены: до возврата (и до сигнала
+                // о завершении из рабочего потока) они должны стать видимыми
+                _mm_sfence();
+            }
+        }
+    }
+
+    #[cfg(target_arch = "aarch64")]
+    {
+        if kernel == Kernel::Neon {
+            // SAFETY: kernel выбран по is_aarch64_feature_detected!, длина out проверена assert'ом
+            (read, written) = unsafe { encode_neon(input, out) };
+        }
+    }
+
+    // Программный prefetch и потоковые store реализованы только в x86-ядрах
+    let _ = (kernel, prefetch, distance, stream);
+    encode_tail(&input[read..], &mut out[written..]);
+}
+
+/// Scalar-кодирование (хвосты и CPU без SIMD).
+fn encode_tail(input: &[u8], out: &mut [u8]) {
+    general_purpose::STANDARD.encode_slice(input, out)
+        .expect("output buffer is sized by encoded_len");
+}
+
+/// AVX2: 24 входных байта -> 32 символа за шаг, цикл развёрнут на 2 шага (48 байт),
+/// prefetch выдаётся раз на развёрнутую итерацию - на каждую 64-байтную линию.
+/// Возвращает (прочитано, записано); прочитанное всегда кратно 3, остаток
+/// кодируется scalar-путём. При `STREAM` адрес `out` должен быть кратен 32.
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx2")]
+unsafe fn encode_avx2<const PREFETCH: bool, const HINT: i32, const STREAM: bool>(
+    input: &[u8],
+    out: &mut [u8],
+    distance: usize,
+) -> (usize, usize) {
+    let len = input.len();
+    let src = input.as_ptr();
+    let dst = out.as_mut_ptr();
+    let mut i = 0;
+    let mut o = 0;
+
+    // Второй 16-байтный load читает [i + 12, i + 28)
+    while i + 24 + 28 <= len {
+        if PREFETCH {
+            // prefetch не генерирует исключений даже за пределами буфера
+            _mm_prefetch::<HINT>(src.wrapping_add(i + distance) as *const i8);
+        }
+        store_avx2::<STREAM>(dst.add(o), encode_block_avx2(src.add(i)));
+        store_avx2::<STREAM>(dst.add(o + 32), encode_block_avx2(src.add(i + 24)));
+        i += 48;
+        o += 64;
+    }
+
+    while i + 28 <= len {
+        store_avx2::<STREAM>(dst.add(o), encode_block_avx2(src.add(i)));
+        i += 24;
+        o += 32;
+    }
+
+    (i, o)
+}
+
+/// Запись 32 символов: обычная или потоковая (адрес кратен 32).
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx2")]
+#[inline]
+unsafe fn store_avx2<const STREAM: bool>(dst: *mut u8, v: __m256i) {
+    if STREAM {
+        _mm256_stream_si256(dst as *mut __m256i, v);
+    } else {
+        _mm256_storeu_si256(dst as *mut __m256i, v);
+    }
+}
+
+/// Кодирует 24 байта по адресу `src` (читает 28) в 32 символа Base64.
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx2")]
+#[inline]
+unsafe fn encode_block_avx2(src: *const u8) -> __m256i {
+    // 1. Две 12-байтные группы по 128-битным половинам регистра
+    let lo = _mm_loadu_si128(src as *const __m128i);
+    let hi = _mm_loadu_si128(src.add(12) as *const __m128i);
+    let input = _mm256_inserti128_si256::<1>(_mm256_castsi128_si256(lo), hi);
+
+    // 2. Каждая тройка [b0, b1, b2] -> 32-битное слово из байт [b1, b0, b2, b1]
+    let shuffled = _mm256_shuffle_epi8(input, _mm256_setr_epi8(
+        1, 0, 2, 1, 4, 3, 5, 4, 7, 6, 8, 7, 10, 9, 11, 10,
+        1, 0, 2, 1, 4, 3, 5, 4, 7, 6, 8, 7, 10, 9, 11, 10,
+    ));
+
+    // 3. Четыре 6-битных индекса в байты слова умножениями 16-битных половин
+    // (Muła, Lemire): mulhi сдвигает вправо индексы 0 и 2, mullo - влево 1 и 3.
+    let t0 = _mm256_and_si256(shuffled, _mm256_set1_epi32(0x0fc0fc00));
+    let t1 = mulhi_epu16_avx2(t0, _mm256_set1_epi32(0x04000040));
+    let t2 = _mm256_and_si256(shuffled, _mm256_set1_epi32(0x003f03f0));
+    let t3 = _mm256_mullo_epi16(t2, _mm256_set1_epi32(0x01000010));
+    let indices = _mm256_or_si256(t1, t3);
+
+    translate_avx2(indices)
+}
+
+/// vpmulhuw напрямую. _mm256_mulhi_epu16 выражен в std через обобщённое
+/// 32-битное умножение, и при константном множителе-степени двойки LLVM
+/// превращает его в расширение + vpsrlvd + упаковку (в 2 раза больше uops).
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx2")]
+#[inline]
+unsafe fn mulhi_epu16_avx2(a: __m256i, b: __m256i) -> __m256i {
+    let result: __m256i;
+    std::arch::asm!(
+        "vpmulhuw {r}, {a}, {b}",
+        r = lateout(ymm_reg) result,
+        a = in(ymm_reg) a,
+        b = in(ymm_reg) b,
+        options(pure, nomem, nostack, preserves_flags),
+    );
+    result
+}
+
+/// Индексы 0..63 -> ASCII алфавита STANDARD (сдвиг по диапазону через pshufb).
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx2")]
+#[inline]
+unsafe fn translate_avx2(indices: __m256i) -> __m256i {
+    // 0..51 -> 0, 52..61 -> 1..10, 62 -> 11, 63 -> 12; 0..25 -> 13
+    let mut offset = _mm256_subs_epu8(indices, _mm256_set1_epi8(51));
+    let less = _mm256_cmpgt_epi8(_mm256_set1_epi8(26), indices);
+    offset = _mm256_or_si256(offset, _mm256_and_si256(less, _mm256_set1_epi8(13)));
+
+    let shift_lut = _mm256_setr_epi8(
+        b'a' as i8 - 26, b'0' as i8 - 52, b'0' as i8 - 52, b'0' as i8 - 52,
+        b'0' as i8 - 52, b'0' as i8 - 52, b'0' as i8 - 52, b'0' as i8 - 52,
+        b'0' as i8 - 52, b'0' as i8 - 52, b'0' as i8 - 52, b'+' as i8 - 62,
+        b'/' as i8 - 63, b'A' as i8, 0, 0,
+        b'a' as i8 - 26, b'0' as i8 - 52, b'0' as i8 - 52, b'0' as i8 - 52,
+        b'0' as i8 - 52, b'0' as i8 - 52, b'0' as i8 - 52, b'0' as i8 - 52,
+        b'0' as i8 - 52, b'0' as i8 - 52, b'0' as i8 - 52, b'+' as i8 - 62,
+        b'/' as i8 - 63, b'A' as i8, 0, 0,
+    );
+
+    _mm256_add_epi8(indices, _mm256_shuffle_epi8(shift_lut, offset))
+}
+
+/// AVX-512 VBMI: 48 входных байт -> 64 символа за шаг (Muła, Lemire).
+/// vpermb раскладывает тройки, vpmultishiftqb извлекает 6-битные индексы,
+/// второй vpermb переводит их в ASCII по алфавиту в zmm-регистре.
+/// Остаток (меньше 64 байт, включая неполную тройку с padding) кодируется
+/// тем же шагом с маскированными load/store - без scalar-эпилога.
+/// Возвращает (прочитано, записано) - всегда весь вход и весь `out`.
+/// При `STREAM` адрес `out` должен быть кратен 64.
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx512f,avx512bw,avx512vbmi")]
+unsafe fn encode_avx512vbmi<const PREFETCH: bool, const HINT: i32, const STREAM: bool>(
+    input: &[u8],
+    out: &mut [u8],
+    distance: usize,
+) -> (usize, usize) {
+    let len = input.len();
+    let src = input.as_ptr();
+    let dst = out.as_mut_ptr();
+    let mut i = 0;
+    let mut o = 0;
+
+    // Каждая тройка [b0, b1, b2] -> 32-битное слово из байт [b1, b0, b2, b1]
+    let shuffle_input = _mm512_setr_epi32(
+        0x01020001, 0x04050304, 0x07080607, 0x0a0b090a,
+        0x0d0e0c0d, 0x10110f10, 0x13141213, 0x16171516,
+        0x191a1819, 0x1c1d1b1c, 0x1f201e1f, 0x22232122,
+        0x25262425, 0x28292728, 0x2b2c2a2b, 0x2e2f2d2e,
+    );
+    // Битовые смещения четырёх индексов в каждой половине 64-битного слова
+    let shifts = _mm512_set1_epi64(0x3036242a1016040a);
+    let lookup = _mm512_loadu_si512(ALPHABET.as_ptr() as *const __m512i);
+
+    // Load читает 64 байта, из них используются 48
+    while i + 64 <= len {
+        if PREFETCH {
+            _mm_prefetch::<HINT>(src.wrapping_add(i + distance) as *const i8);
+        }
+        let v = _mm512_loadu_si512(src.add(i) as *const __m512i);
+        let result = _mm512_permutexvar_epi8(
+            _mm512_multishift_epi64_epi8(shifts, _mm512_permutexvar_epi8(shuffle_input, v)),
+            lookup,
+        );
+        if STREAM {
+            _mm512_stream_si512(dst.add(o) as *mut __m512i, result);
+        } else {
+            _mm512_storeu_si512(dst.add(o) as *mut __m512i, result);
+        }
+        i += 48;
+        o += 64;
+    }
+
+    while i < len {
+        let rest = (len - i).min(48);
+        // Байты за концом входа не читаются (маска) и равны нулю
+        let v = _mm512_maskz_loadu_epi8(low_mask(rest), src.add(i) as *const i8);
+        // vpermb использует только младшие 6 бит индекса - маска не нужна
+        let result = _mm512_permutexvar_epi8(
+            _mm512_multishift_epi64_epi8(shifts, _mm512_permutexvar_epi8(shuffle_input, v)),
+            lookup,
+        );
+        i += rest;
+        o += store_tail_avx512(dst.add(o), rest, result);
+    }
+
+    (i, o)
+}
+
+/// AVX-512BW (без VBMI): 48 входных байт -> 64 символа за шаг.
+/// Алгоритм AVX2 на четырёх 128-битных дорожках: vpermd раскладывает 12-байтные
+/// группы по дорожкам, перевод в ASCII - vpshufb и сложение по маске диапазона.
+/// Остаток кодируется маскированными шагами, как в encode_avx512vbmi.
+/// Возвращает (прочитано, записано) - всегда весь вход и весь `out`.
+/// При `STREAM` адрес `out` должен быть кратен 64.
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx512f,avx512bw")]
+unsafe fn encode_avx512bw<const PREFETCH: bool, const HINT: i32, const STREAM: bool>(
+    input: &[u8],
+    out: &mut [u8],
+    distance: usize,
+) -> (usize, usize) {
+    let len = input.len();
+    let src = input.as_ptr();
+    let dst = out.as_mut_ptr();
+    let mut i = 0;
+    let mut o = 0;
+
+    // Дорожка k получает 32-битные слова 3k..3k+2 (байты 12k..12k+11)
+    let spread = _mm512_setr_epi32(0, 1, 2, 0, 3, 4, 5, 0, 6, 7, 8, 0, 9, 10, 11, 0);
+    // Каждая тройка [b0, b1, b2] -> 32-битное слово из байт [b1, b0, b2, b1]
+    let shuffle_input = _mm512_broadcast_i32x4(_mm_setr_epi8(
+        1, 0, 2, 1, 4, 3, 5, 4, 7, 6, 8, 7, 10, 9, 11, 10,
+    ));
+
+    // Load читает 64 байта, из них используются 48
+    while i + 64 <= len {
+        if PREFETCH {
+            _mm_prefetch::<HINT>(src.wrapping_add(i + distance) as *const i8);
+        }
+        let v = _mm512_loadu_si512(src.add(i) as *const __m512i);
+        let result = encode_block_avx512bw(
+            _mm512_shuffle_epi8(_mm512_permutexvar_epi32(spread, v), shuffle_input),
+        );
+
+        if STREAM {
+            _mm512_stream_si512(dst.add(o) as *mut __m512i, result);
+        } else {
+            _mm512_storeu_si512(dst.add(o) as *mut __m512i, result);
+        }
+        i += 48;
+        o += 64;
+    }
+
+    while i < len {
+        let rest = (len - i).min(48);
+        let v = _mm512_maskz_loadu_epi8(low_mask(rest), src.add(i) as *const i8);
+        let result = encode_block_avx512bw(
+            _mm512_shuffle_epi8(_mm512_permutexvar_epi32(spread, v), shuffle_input),
+        );
+        i += rest;
+        o += store_tail_avx512(dst.add(o), rest, result);
+    }
+
+    (i, o)
+}
+
+/// Слова [b1, b0, b2, b1] -> 4 символа на слово (шаг encode_avx512bw).
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx512f,avx512bw")]
+#[inline]
+unsafe fn encode_block_avx512bw(v: __m512i) -> __m512i {
+    // Индексы как в AVX2, но умножения на степени двойки заменены
+    // 16-битными сдвигами на разную величину (vpsrlvw/vpsllvw есть в BW)
+    let t0 = _mm512_and_si512(v, _mm512_set1_epi32(0x0fc0fc00));
+    let t1 = _mm512_srlv_epi16(t0, _mm512_set1_epi32(0x0006000a));
+    let t2 = _mm512_and_si512(v, _mm512_set1_epi32(0x003f03f0));
+    let t3 = _mm512_sllv_epi16(t2, _mm512_set1_epi32(0x00080004));
+    translate_avx512bw(_mm512_or_si512(t1, t3))
+}
+
+/// Маска младших `n` бит (n <= 64) для маскированных load/store AVX-512.
+#[cfg(target_arch = "x86_64")]
+#[inline]
+fn low_mask(n: usize) -> u64 {
+    if n >= 64 { u64::MAX } else { (1u64 << n) - 1 }
+}
+
+/// Маскированная запись последнего шага AVX-512: из `rest` (1..=48) входных
+/// байт получается encoded_len(rest) символов. Недостающие байты неполной
+/// тройки были нулями, как того требует Base64, а их символы заменяются '='.
+/// Возвращает число записанных символов.
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx512f,avx512bw")]
+#[inline]
+unsafe fn store_tail_avx512(dst: *mut u8, rest: usize, result: __m512i) -> usize {
+    let chars = rest.div_ceil(3) * 4;
+    let padding = (3 - rest % 3) % 3;
+    let pad_mask = low_mask(chars) & !low_mask(chars - padding);
+    let result = _mm512_mask_blend_epi8(pad_mask, result, _mm512_set1_epi8(b'=' as i8));
+    _mm512_mask_storeu_epi8(dst as *mut i8, low_mask(chars), result);
+    chars
+}
+
+/// Индексы 0..63 -> ASCII алфавита STANDARD: сдвиг по диапазону через vpshufb,
+/// диапазон 'A'..'Z' - сложением по маске (vpaddb с k-маской).
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx512f,avx512bw")]
+#[inline]
+unsafe fn translate_avx512bw(indices: __m512i) -> __m512i {
+    // 26..51 -> 0, 52..61 -> 1..10, 62 -> 11, 63 -> 12
+    let offset = _mm512_subs_epu8(indices, _mm512_set1_epi8(51));
+    let upper = _mm512_cmplt_epu8_mask(indices, _mm512_set1_epi8(26));
+
+    let shift_lut = _mm512_broadcast_i32x4(_mm_setr_epi8(
+        b'a' as i8 - 26, b'0' as i8 - 52, b'0' as i8 - 52, b'0' as i8 - 52,
+        b'0' as i8 - 52, b'0' as i8 - 52, b'0' as i8 - 52, b'0' as i8 - 52,
+        b'0' as i8 - 52, b'0' as i8 - 52, b'0' as i8 - 52, b'+' as i8 - 62,
+        b'/' as i8 - 63, 0, 0, 0,
+    ));
+    let shifted = _mm512_add_epi8(indices, _mm512_shuffle_epi8(shift_lut, offset));
+
+    // 0..25 -> 'A'..'Z'
+    _mm512_mask_add_epi8(shifted, upper, indices, _mm512_set1_epi8(b'A' as i8))
+}
+
+/// AVX2 decode: 32 символа -> 24 байта за шаг (Muła, Lemire).
+/// Проверка алфавита - два vpshufb по нибблам: lut_lo[lo] & lut_hi[hi] != 0
+/// у любого символа вне алфавита (в том числе '=' и байтов >= 0x80), так что
+/// весь блок проверяется одним vptest. Перевод в 6-битные значения - сдвиг
+/// по старшему нибблу (отдельно для '/'), склейка - vpmaddubsw/vpmaddwd.
+/// Останавливается перед первым блоком с недопустимым символом.
+/// Возвращает (прочитано, записано).
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx2")]
+unsafe fn decode_avx2(input: &[u8], out: &mut [u8]) -> (usize, usize) {
+    let len = input.len();
+    let src = input.as_ptr();
+    let dst = out.as_mut_ptr();
+    let mut i = 0;
+    let mut o = 0;
+
+    let lut_lo = _mm256_broadcastsi128_si256(_mm_setr_epi8(
+        0x15, 0x11, 0x11, 0x11, 0x11, 0x11, 0x11, 0x11,
+        0x11, 0x11, 0x13, 0x1a, 0x1b, 0x1b, 0x1b, 0x1a,
+    ));
+    let lut_hi = _mm256_broadcastsi128_si256(_mm_setr_epi8(
+        0x10, 0x10, 0x01, 0x02, 0x04, 0x08, 0x04, 0x08,
+        0x10, 0x10, 0x10, 0x10, 0x10, 0x10, 0x10, 0x10,
+    ));
+    let lut_roll = _mm256_broadcastsi128_si256(_mm_setr_epi8(
+        0, 16, 19, 4, -65, -65, -71, -71, 0, 0, 0, 0, 0, 0, 0, 0,
+    ));
+    let mask_2f = _mm256_set1_epi8(0x2f);
+    let pack = _mm256_broadcastsi128_si256(_mm_setr_epi8(
+        2, 1, 0, 6, 5, 4, 10, 9, 8, 14, 13, 12, -1, -1, -1, -1,
+    ));
+    let pack_lanes = _mm256_setr_epi32(0, 1, 2, 4, 5, 6, 7, 7);
+
+    // Запись 32 байт, из которых значимы 24: последние 8 перезапишет следующий шаг
+    while i + 32 <= len && o + 32 <= out.len() {
+        let v = _mm256_loadu_si256(src.add(i) as *const __m256i);
+        let hi_nibbles = _mm256_and_si256(_mm256_srli_epi32(v, 4), mask_2f);
+        let lo_nibbles = _mm256_and_si256(v, mask_2f);
+        let lo = _mm256_shuffle_epi8(lut_lo, lo_nibbles);
+        let hi = _mm256_shuffle_epi8(lut_hi, hi_nibbles);
+        if _mm256_testz_si256(lo, hi) == 0 {
+            break;
+        }
+
+        // '/' и '+' делят старший ниббл 2: '/' получает свой сдвиг (индекс 1)
+        let eq_2f = _mm256_cmpeq_epi8(v, mask_2f);
+        let roll = _mm256_shuffle_epi8(lut_roll, _mm256_add_epi8(eq_2f, hi_nibbles));
+        let values = _mm256_add_epi8(v, roll);
+
+        // [a, b, c, d] -> a << 18 | b << 12 | c << 6 | d в каждом 32-битном слове
+        let merged = _mm256_maddubs_epi16(values, _mm256_set1_epi32(0x01400140));
+        let merged = _mm256_madd_epi16(merged, _mm256_set1_epi32(0x00011000));
+        let packed = _mm256_permutevar8x32_epi32(_mm256_shuffle_epi8(merged, pack), pack_lanes);
+        _mm256_storeu_si256(dst.add(o) as *mut __m256i, packed);
+        i += 32;
+        o += 24;
+    }
+
+    (i, o)
+}
+
+/// AVX-512 VBMI decode: 64 символа -> 48 байт за шаг (Muła, Lemire).
+/// vpermi2b переводит ASCII в 6-битные значения по 128-байтной таблице,
+/// vpmaddubsw/vpmaddwd склеивают их в 24-битные слова, vpermb упаковывает.
+/// Останавливается перед первым блоком с символом вне алфавита (в том числе
+/// '=' и байтами >= 0x80) - его разбирает scalar-путь.
+/// Возвращает (прочитано, записано).
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx512f,avx512bw,avx512vbmi")]
+unsafe fn decode_avx512vbmi(input: &[u8], out: &mut [u8]) -> (usize, usize) {
+    let len = input.len();
+    let src = input.as_ptr();
+    let dst = out.as_mut_ptr();
+    let mut i = 0;
+    let mut o = 0;
+
+    let lookup_lo = _mm512_loadu_si512(DECODE_LUT.as_ptr() as *const __m512i);
+    let lookup_hi = _mm512_loadu_si512(DECODE_LUT.as_ptr().add(64) as *const __m512i);
+    let pack = _mm512_loadu_si512(DECODE_PACK.as_ptr() as *const __m512i);
+
+    while i + 64 <= len && o + 48 <= out.len() {
+        let v = _mm512_loadu_si512(src.add(i) as *const __m512i);
+        // Бит 6 индекса выбирает lookup_hi, бит 7 vpermi2b не смотрит
+        let values = _mm512_permutex2var_epi8(lookup_lo, v, lookup_hi);
+        if _mm512_movepi8_mask(_mm512_or_si512(v, values)) != 0 {
+            break;
+        }
+
+        // [a, b, c, d] -> a << 18 | b << 12 | c << 6 | d в каждом 32-битном слове
+        let merged = _mm512_maddubs_epi16(values, _mm512_set1_epi32(0x01400140));
+        let merged = _mm512_madd_epi16(merged, _mm512_set1_epi32(0x00011000));
+        let packed = _mm512_permutexvar_epi8(pack, merged);
+        _mm512_mask_storeu_epi8(dst.add(o) as *mut i8, 0x0000_ffff_ffff_ffff, packed);
+        i += 64;
+        o += 48;
+    }
+
+    (i, o)
+}
+
+/// NEON: 48 входных байт -> 64 символа за шаг (по мотивам base64simd, Muła).
+/// vld3q_u8 сразу раскладывает тройки по трём регистрам (b0, b1, b2 для 16 групп),
+/// индексы получаются сдвигами, перевод в ASCII - vqtbl4q_u8 по алфавиту в
+/// четырёх регистрах, vst4q_u8 перемежает индексы обратно при записи.
+/// Возвращает (прочитано, записано); прочитанное кратно 3.
+#[cfg(target_arch = "aarch64")]
+#[target_feature(enable = "neon")]
+unsafe fn encode_neon(input: &[u8], out: &mut [u8]) -> (usize, usize) {
+    let len = input.len();
+    let src = input.as_ptr();
+    let dst = out.as_mut_ptr();
+    let mut i = 0;
+    let mut o = 0;
+
+    let lookup = vld1q_u8_x4(ALPHABET.as_ptr());
+    let mask = vdupq_n_u8(0x3f);
+
+    while i + 48 <= len {
+        let v = vld3q_u8(src.add(i));
+
+        // b0 >> 2 | (b0 << 4 | b1 >> 4) & 63 | (b1 << 2 | b2 >> 6) & 63 | b2 & 63
+        let i0 = vshrq_n_u8::<2>(v.0);
+        let i1 = vandq_u8(vsliq_n_u8::<4>(vshrq_n_u8::<4>(v.1), v.0), mask);
+        let i2 = vandq_u8(vsliq_n_u8::<2>(vshrq_n_u8::<6>(v.2), v.1), mask);
+        let i3 = vandq_u8(v.2, mask);
+
+        vst4q_u8(dst.add(o), uint8x16x4_t(
+            vqtbl4q_u8(lookup, i0),
+            vqtbl4q_u8(lookup, i1),
+            vqtbl4q_u8(lookup, i2),
+            vqtbl4q_u8(lookup, i3),
+        ));
+        i += 48;
+        o += 64;
+    }
+
+    (i, o)
+}
+
+/// Алфавит STANDARD для табличного перевода (AVX-512 VBMI, NEON).
+#[cfg(any(target_arch = "x86_64", target_arch = "aarch64"))]
+static ALPHABET: [u8; 64] = *b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/";
+
+/// ASCII -> 6-битное значение для decode, 0x80 - символ вне алфавита.
+#[cfg(target_arch = "x86_64")]
+static DECODE_LUT: [u8; 128] = {
+    let mut lut = [0x80u8; 128];
+    let mut i = 0;
+    while i < 64 {
+        lut[ALPHABET[i] as usize] = i as u8;
+        i += 1;
+    }
+    lut
+};
+
+/// Тройка байт j слова k лежит в байтах 4k + 2 - j (старший - первый).
+#[cfg(target_arch = "x86_64")]
+static DECODE_PACK: [u8; 64] = {
+    let mut pack = [0u8; 64];
+    let mut j = 0;
+    while j < 48 {
+        pack[j] = (j / 3 * 4 + 2 - j % 3) as u8;
+        j += 1;
+    }
+    pack
+};
@@ -1,64 +1,80 @@
 #!/usr/bin/env python3
 """Тест автоматического выбора алгоритма."""
 
-import os
-import time
+import statistics
+import sys
+
 import ultrabase64
 
-def benchmark_implementation(func_name, data):
-    """Бенчмарк конкретной реализации."""
-    func = getattr(ultrabase64, func_name)
+from bench_utils import get_test_data, measure, median_mad, pin_and_prioritize
 
-    # Прогрев
-    _ = func(data)
+# Rayon замеряется напрямую: encode() выбирает стратегию по размеру и
+# с PIPELINE_THRESHOLD (20MB) сам переходит на Pipeline
+_RAYON_THREADS = int(ultrabase64.get_info()['available_cpus'])
+
+# Реализации связываются один раз, без getattr на каждый замер: функция и
+# дополнительные аргументы после data. Число потоков передаётся аргументом,
+# а не через lambda, чтобы измеряемый вызов обеих колонок стоил одинаково
+_IMPLS = {
+    'rayon': (ultrabase64.encode_with_threads, (_RAYON_THREADS,)),
+    'encode_pipeline_py': (ultrabase64.encode_pipeline_py, ()),
+    'encode_auto': (ultrabase64.encode_auto, ()),
+}
 
-    # Основной тест - 3 итерации
-    times = []
-    for _ in range(3):
-        start = time.perf_counter()
-        result = func(data)
-        end = time.perf_counter()
-        times.append(end - start)
+def benchmark_implementation(impl, data):
+    """Бенчмарк конкретной реализации: медиана и MAD времени вызова (секунды)."""
+    func, args = impl
+
+    # Прогрев
+    result = func(data, *args)
 
-    best_time = min(times)
-    return best_time, len(result)
+    # Основной тест - серии по >= 0.2 с (timeit autorange), 7 повторов
+    median_ns, mad_ns = median_mad(measure(func, data, *args))
+    return median_ns * 1e-9, mad_ns * 1e-9, len(result)
 
 def compare_at_size(size_mb):
     """Сравнивает все три реализации на данном размере."""
     size_bytes = size_mb * 1024 * 1024
-    data = os.urandom(size_bytes)
+    data = get_test_data(size_bytes)
 
     # Тестируем все реализации
-    rayon_time, rayon_len = benchmark_implementation('encode', data)
-    pipeline_time, pipeline_len = benchmark_implementation('encode_pipeline_py', data)
-    auto_time, auto_len = benchmark_implementation('encode_auto', data)
+    rayon_time, _, rayon_len = benchmark_implementation(_IMPLS['rayon'], data)
+    pipeline_time, _, pipeline_len = benchmark_implementation(_IMPLS['encode_pipeline_py'], data)
+    auto_time, auto_mad, auto_len = benchmark_implementation(_IMPLS['encode_auto'], data)
 
     # Проверяем корректность
     if not (rayon_len == pipeline_len == auto_len):
-        return None, None, None, "ERROR: Different output lengths!"
+        return None, None, None, None, "ERROR: Different output lengths!"
 
     rayon_speed = size_mb / rayon_time
     pipeline_speed = size_mb / pipeline_time
     auto_speed = size_mb / auto_time
+    auto_mad_pct = auto_mad / auto_time * 100  # MAD в процентах от медианы
 
-    return rayon_speed, pipeline_speed, auto_speed, None
+    return rayon_speed, pipeline_speed, auto_speed, auto_mad_pct, None
 
 def main():
+    # Без привязки к ядру: реализации многопоточные
+    pin_and_prioritize()
+
     print("🔬 Auto Algorithm Selection Benchmark")
     print("=" * 95)
-    print(f"{'Size':<10} {'Rayon':<15} {'Pipeline':<15} {'Auto':<15} {'Best':<15}")
-    print(f"{'':10} {'(MB/s)':<15} {'(MB/s)':<15} {'(MB/s)':<15} {'Choice':<15}")
+    print(f"{'Size':<10} {'Rayon':<15} {'Pipeline':<15} {'Auto':<15} {'Auto':<10} {'Best':<15}")
+    print(f"{'':10} {'(MB/s)':<15} {'(MB/s)':<15} {'(MB/s)':<15} {'MAD':<10} {'Choice':<15}")
     print("-" * 95)
 
     sizes = [1, 2, 5, 10, 15, 20, 25, 30, 40, 50, 60, 70, 80, 90, 100]
 
+    sys.stdout.flush()
+
     results = []
+    rows = []
     for size_mb in sizes:
         try:
-            rayon_speed, pipeline_speed, auto_speed, error = compare_at_size(size_mb)
+            rayon_speed, pipeline_speed, auto_speed, auto_mad, error = compare_at_size(size_mb)
 
             if error:
-                print(f"{size_mb:>3} MB     {error}")
+                rows.append(f"{size_mb:>3} MB     {error}")
                 continue
 
             # Определяем лучший алгоритм
@@ -71,11 +87,12 @@ def main():
             # Проверяем насколько Auto близок к лучшему
             auto_efficiency = (auto_speed / best_speed) * 100
 
-            print(f"{size_mb:>3} MB     "
-                  f"{rayon_speed:>8.2f}      "
-                  f"{pipeline_speed:>8.2f}       "
-                  f"{auto_speed:>8.2f}       "
-                  f"{best_algo} ({auto_efficiency:.1f}%)")
+            rows.append(f"{size_mb:>3} MB     "
+                        f"{rayon_speed:>8.2f}      "
+                        f"{pipeline_speed:>8.2f}       "
+                        f"{auto_speed:>8.2f}       "
+                        f"{'±' + format(auto_mad, '.1f') + '%':<11}"
+                        f"{best_algo} ({auto_efficiency:.1f}%)")
 
             results.append({
                 'size': size_mb,
@@ -87,7 +104,12 @@ def main():
             })
 
         except Exception as e:
-            print(f"{size_mb:>3} MB     ERROR: {e}")
+            rows.append(f"{size_mb:>3} MB     ERROR: {e}")
+
+    # Строки таблицы выводятся одной записью после замеров: вывод в консоль
+    # между точками замера возмущает кэш и добавляет системные вызовы
+    sys.stdout.write("\n".join(rows) + "\n")
+    sys.stdout.flush()
 
     # Анализ результатов
     if results:
@@ -96,31 +118,23 @@ def main():
         print("-" * 95)
 
         # Средняя эффективность Auto
-        avg_auto_efficiency = sum(r['auto'] / r['best'] * 100 for r in results) / len(results)
-        print(f"Average Auto efficiency: {avg_auto_efficiency:.2f}% of best")
+        auto_efficiency = statistics.mean(r['auto'] / r['best'] * 100 for r in results)
+        print(f"Average Auto efficiency: {auto_efficiency:.2f}% of best")
 
         # Считаем сколько раз Auto выбрал правильный алгоритм
         # Auto должен:
         # - Использовать Rayon для < 20MB
         # - Использовать Pipeline для >= 20MB (за пределами cache)
-        auto_optimal_count = 0
-        for r in results:
-            size = r['size']
-            # Оцениваем выбор Auto по производительности
-            if r['auto'] >= r['best'] * 0.95:  # В пределах 5% от лучшего
-                auto_optimal_count += 1
+        # Оцениваем выбор Auto по производительности: в пределах 5% от лучшего
+        auto_optimal_count = sum(1 for r in results if r['auto'] >= r['best'] * 0.95)
 
         print(f"Auto within 5% of best: {auto_optimal_count}/{len(results)} cases ({auto_optimal_count/len(results)*100:.1f}%)")
 
         # Средние скорости
-        avg_rayon = sum(r['rayon'] for r in results) / len(results)
-        avg_pipeline = sum(r['pipeline'] for r in results) / len(results)
-        avg_auto = sum(r['auto'] for r in results) / len(results)
-
         print()
-        print(f"Average Rayon:    {avg_rayon:.2f} MB/s")
-        print(f"Average Pipeline: {avg_pipeline:.2f} MB/s")
-        print(f"Average Auto:     {avg_auto:.2f} MB/s")
+        print(f"Average Rayon:    {statistics.mean(r['rayon'] for r in results):.2f} MB/s")
+        print(f"Average Pipeline: {statistics.mean(r['pipeline'] for r in results):.2f} MB/s")
+        print(f"Average Auto:     {statistics.mean(r['auto'] for r in results):.2f} MB/s")
 
 if __name__ == "__main__":
     main()
@@ -1,46 +1,40 @@
 #!/usr/bin/env python3
 """Тест производительности конвейерной реализации."""
 
-import os
-import time
 import ultrabase64
 
-def benchmark_size(size_mb):
-    """Бенчмарк для определенного размера."""
-    size_bytes = size_mb * 1024 * 1024
-    data = os.urandom(size_bytes)
+from bench_utils import get_test_data, pin_and_prioritize
 
-    # Прогрев
-    _ = ultrabase64.encode(data)
-
-    # Основной тест - 3 итерации
-    times = []
-    for _ in range(3):
-        start = time.perf_counter()
-        result = ultrabase64.encode(data)
-        end = time.perf_counter()
-        times.append(end - start)
-
-    # Берем лучшее время
-    best_time = min(times)
-    speed_mbps = size_mb / best_time
-
-    return speed_mbps, len(result)
+# Количество замеров на каждый размер (внутри bench_sweep)
+ITERATIONS = 10
 
 def main():
+    # Без привязки к ядру: реализации многопоточные
+    pin_and_prioritize()
+
     print("🔬 Pipeline vs Rayon Benchmark")
     print("=" * 60)
-    print(f"{'Size':<10} {'Speed (MB/s)':<15} {'Encoded Size':<15}")
+    print(f"{'Size':<10} {'Speed (MB/s)':<15} {'MAD':<8} {'Encoded Size':<15}")
     print("-" * 60)
 
     sizes = [1, 2, 5, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
-
-    for size_mb in sizes:
-        try:
-            speed, encoded_size = benchmark_size(size_mb)
-            print(f"{size_mb:>3} MB     {speed:>8.2f} MB/s    {encoded_size:>12,} bytes")
-        except Exception as e:
-            print(f"{size_mb:>3} MB     ERROR: {e}")
+    sizes_bytes = [size_mb * 1024 * 1024 for size_mb in sizes]
+
+    # Весь прогон - один вызов в Rust: GIL отпускается один раз,
+    # замеры не включают накладные расходы Python-цикла и вызова
+    data = get_test_data(max(sizes_bytes))
+    try:
+        results = ultrabase64.bench_sweep(data, sizes_bytes, ITERATIONS)
+    except Exception as e:
+        print(f"ERROR: {e}")
+        return
+
+    for size_mb, size_bytes, (median_ns, mad_ns) in zip(sizes, sizes_bytes, results):
+        # Скорость по медиане, MAD - в процентах от медианы
+        speed = size_mb / (median_ns * 1e-9)
+        mad_str = f"±{mad_ns / median_ns * 100:.1f}%"
+        encoded_size = (size_bytes + 2) // 3 * 4
+        print(f"{size_mb:>3} MB     {speed:>8.2f} MB/s    {mad_str:<9}{encoded_size:>12,} bytes")
 
 if __name__ == "__main__":
     main()
@@ -4,7 +4,7 @@
 """
 
 import base64
-import random
+import os
 import time
 import ultrabase64
 
@@ -28,17 +28,18 @@ def test_basic_encoding():
 def test_large_data():
     """Тест с большими данными"""
     # Создаем 1MB случайных данных
-    large_data = bytes([random.randint(0, 255) for _ in range(1024 * 1024)])
+    large_data = os.urandom(1024 * 1024)
+    large_view = memoryview(large_data)
     
-    # Наше кодирование
-    start_time = time.time()
-    encoded = ultrabase64.encode(large_data)
-    our_time = time.time() - start_time
+    # Наше кодирование (буфер читается на месте, без копии)
+    start_time = time.perf_counter()
+    encoded = ultrabase64.encode(large_view)
+    our_time = time.perf_counter() - start_time
     
     # Стандартное кодирование
-    start_time = time.time()
+    start_time = time.perf_counter()
     standard_encoded = base64.b64encode(large_data).decode('utf-8')
-    standard_time = time.time() - start_time
+    standard_time = time.perf_counter() - start_time
     
     # Проверяем корректность
     decoded = ultrabase64.decode(encoded)
@@ -52,13 +53,13 @@ def test_large_data():
 
 def test_threading():
     """Тест многопоточного кодирования"""
-    large_data = bytes([random.randint(0, 255) for _ in range(512 * 1024)])
+    large_data = os.urandom(512 * 1024)
     
     # Тест с разным количеством потоков
     for threads in [1, 2, 4, 8]:
-        start_time = time.time()
+        start_time = time.perf_counter()
         encoded = ultrabase64.encode_with_threads(large_data, threads)
-        thread_time = time.time() - start_time
+        thread_time = time.perf_counter() - start_time
         
         # Проверяем корректность
         decoded = ultrabase64.decode(encoded)
@@ -86,6 +87,155 @@ def test_edge_cases():
     print("✓ Edge cases test passed")
 
 
+def test_encode_into():
+    """Тест кодирования в предоставленный буфер"""
+    for size in [0, 1, 2, 3, 1000, 4 * 1024 * 1024 + 1]:
+        test_data = os.urandom(size)
+        expected = base64.b64encode(test_data)
+
+        out = bytearray(len(expected) + 8)
+        written = ultrabase64.encode_into(test_data, out)
+        assert written == len(expected), f"encode_into length mismatch for {size} bytes"
+        assert out[:written] == expected, f"encode_into mismatch for {size} bytes"
+
+    # Запись в срез большего буфера через memoryview
+    buf = bytearray(b"#" * 12)
+    written = ultrabase64.encode_into(b"abc", memoryview(buf)[4:])
+    assert written == 4 and buf == b"####YWJj####", f"encode_into into memoryview slice failed: {buf!r}"
+
+    # Слишком маленький буфер
+    try:
+        ultrabase64.encode_into(b"abc", bytearray(3))
+        assert False, "Should have raised ValueError for small buffer"
+    except ValueError:
+        pass
+
+    # Срез memoryview на байт меньше результата
+    test_data = os.urandom(1000)
+    buf = bytearray(2000)
+    try:
+        ultrabase64.encode_into(test_data, memoryview(buf)[100:100 + len(base64.b64encode(test_data)) - 1])
+        assert False, "Should have raised ValueError for small memoryview slice"
+    except ValueError:
+        pass
+    assert buf == bytearray(2000), "encode_into wrote into a too small buffer"
+
+    # Вход и выход в одном bytearray: непересекающиеся срезы допустимы...
+    buf = bytearray(b"abc" + b"#" * 13)
+    written = ultrabase64.encode_into(memoryview(buf)[:3], memoryview(buf)[8:])
+    assert written == 4 and buf == b"abc#####YWJj####", f"encode_into within one bytearray failed: {buf!r}"
+
+    # ...а пересекающиеся отклоняются
+    buf = bytearray(b"abc" + b"#" * 13)
+    try:
+        ultrabase64.encode_into(memoryview(buf)[:3], memoryview(buf)[2:])
+        assert False, "Should have raised ValueError for overlapping buffers"
+    except ValueError:
+        pass
+    assert buf == b"abc" + b"#" * 13, "encode_into wrote into an overlapping buffer"
+
+    # Буфер только для чтения
+    try:
+        ultrabase64.encode_into(b"abc", bytes(4))
+        assert False, "Should have raised TypeError for read-only buffer"
+    except TypeError:
+        pass
+
+    print("✓ encode_into test passed")
+
+
+def test_encode_many():
+    """Тест пакетного кодирования"""
+    items = [b"", b"A", os.urandom(1000), bytearray(os.urandom(4097)), memoryview(os.urandom(3 * 1024))]
+    expected = [base64.b64encode(item).decode('ascii') for item in items]
+
+    assert ultrabase64.encode_many(items) == expected, "encode_many mismatch"
+    assert ultrabase64.encode_many(iter(items)) == expected, "encode_many must accept any iterable"
+    assert ultrabase64.encode_many([]) == []
+
+    print("✓ encode_many test passed")
+
+
+def test_bench_sweep():
+    """Тест встроенного бенчмарка по набору размеров"""
+    data = os.urandom(64 * 1024)
+    sizes = [0, 1, 1024, len(data)]
+
+    results = ultrabase64.bench_sweep(data, sizes, 3)
+    assert len(results) == len(sizes), "bench_sweep must return one result per size"
+    for median_ns, mad_ns in results:
+        assert median_ns >= 0 and mad_ns >= 0
+
+    # Размер больше входных данных
+    try:
+        ultrabase64.bench_sweep(data, [len(data) + 1], 1)
+        assert False, "Should have raised ValueError for oversized prefix"
+    except ValueError:
+        pass
+
+    print("✓ bench_sweep test passed")
+
+
+def test_buffer_inputs():
+    """Тест кодирования объектов с buffer protocol без копирования"""
+    import array
+    import mmap
+
+    data = os.urandom(10 * 1024 + 1)
+    expected = base64.b64encode(data).decode('ascii')
+
+    mapped = mmap.mmap(-1, len(data))
+    mapped.write(data)
+    for buffer_input in [bytearray(data), memoryview(data), array.array('B', data), mapped]:
+        assert ultrabase64.encode(buffer_input) == expected, f"encode mismatch for {type(buffer_input).__name__}"
+        assert ultrabase64.encode_bytes(buffer_input) == expected.encode('ascii')
+    mapped.close()
+
+    # decode принимает и str, и bytes-like объекты
+    encoded = expected.encode('ascii')
+    for buffer_input in [expected, encoded, bytearray(encoded), memoryview(encoded)]:
+        assert ultrabase64.decode(buffer_input) == data, f"decode mismatch for {type(buffer_input).__name__}"
+
+    # Несмежный буфер отклоняется
+    try:
+        ultrabase64.encode(memoryview(data)[::2])
+        assert False, "Should have raised error for non-contiguous buffer"
+    except (ValueError, BufferError):
+        pass
+
+    print("✓ Buffer inputs test passed")
+
+
+def test_pipeline_threshold():
+    """Тест размера чуть выше PIPELINE_THRESHOLD (20 MB): стыки чанков конвейера и хвост"""
+    pipeline_threshold = 20 * 1024 * 1024
+    size = pipeline_threshold + 1001  # не кратно 3: хвост с паддингом '='
+    assert size % 3 != 0
+    data = os.urandom(size)
+    expected = base64.b64encode(data).decode('ascii')
+
+    for name in ("encode", "encode_auto", "encode_pipeline_py"):
+        encoded = getattr(ultrabase64, name)(data)
+        assert encoded == expected, f"{name} mismatch for size {size}"
+    assert ultrabase64.decode(expected) == data, f"decode round-trip failed for size {size}"
+
+    print("✓ Pipeline threshold test passed")
+
+
+def test_prefetch_variants():
+    """Тест отладочных вариантов кодировщика с prefetch"""
+    for size in [0, 1, 2, 3, 47, 48, 49, 100 * 1024 + 1]:
+        data = os.urandom(size)
+        expected = base64.b64encode(data).decode('ascii')
+
+        assert ultrabase64.encode_no_prefetch(data) == expected, f"encode_no_prefetch mismatch for size {size}"
+        assert ultrabase64.encode_prefetch_t0(data) == expected, f"encode_prefetch_t0 mismatch for size {size}"
+        assert ultrabase64.encode_prefetch_nta(data, 64) == expected, f"encode_prefetch_nta mismatch for size {size}"
+        assert ultrabase64.encode_prefetch_nta(data, 128, stream=True) == expected, f"streaming encode_prefetch_nta mismatch for size {size}"
+
+    print("✓ Prefetch variants test passed")
+
+
 def benchmark():
     """Бенчмарк производительности"""
     sizes = [1024, 10*1024, 100*1024, 1024*1024]  # 1KB, 10KB, 100KB, 1MB
@@ -95,19 +245,21 @@ def benchmark():
     print("-" * 50)
     
     for size in sizes:
-        data = bytes([random.randint(0, 255) for _ in range(size)])
+        data = os.urandom(size)
         
-        # Наша библиотека
-        start = time.time()
+        # Наша библиотека: вывод в один заранее выделенный буфер,
+        # выделение памяти под результат не попадает в замер
+        out = bytearray((len(data) + 2) // 3 * 4)
+        start = time.perf_counter()
         for _ in range(10):  # 10 итераций для усреднения
-            ultrabase64.encode(data)
-        our_time = (time.time() - start) / 10
+            ultrabase64.encode_into(data, out)
+        our_time = (time.perf_counter() - start) / 10
         
         # Стандартная библиотека
-        start = time.time()
+        start = time.perf_counter()
         for _ in range(10):
             base64.b64encode(data)
-        std_time = (time.time() - start) / 10
+        std_time = (time.perf_counter() - start) / 10
         
         speedup = std_time / our_time if our_time > 0 else float('inf')
         
@@ -122,6 +274,12 @@ if __name__ == "__main__":
     test_large_data()
     test_threading()
     test_edge_cases()
+    test_encode_into()
+    test_encode_many()
+    test_bench_sweep()
+    test_buffer_inputs()
+    test_pipeline_threshold()
+    test_prefetch_variants()
     benchmark()
     
     print("\n🎉 All tests passed!")
\ No newline at end of file